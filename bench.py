@@ -0,0 +1,251 @@
+import argparse
+import json
+import platform
+import random
+import resource
+import string
+import sys
+import time
+from multiprocessing import get_context
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_SIZES = (500, 5000)
+DEFAULT_BASELINE = "bench-baseline.json"
+# Passwords per base word requested from each worldpasses pattern
+PATTERN_QUOTA = 100
+
+
+def synthetic_words(count: int, seed: int = 1234) -> List[str]:
+    """A fixed wordlist of count lower-case words of 4-10 letters."""
+    rng = random.Random(seed)
+    return [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+            for _ in range(count)]
+
+
+def _manipulator():
+    from mixer import WordlistManipulator
+    return WordlistManipulator(seed=1, quiet=True)
+
+
+def _password_generator(words: List[str]):
+    from passmaster import PasswordGenerator
+    generator = PasswordGenerator()
+    generator.quiet = True
+    generator.words = set(words)
+    return generator
+
+
+def _per_word(method: Callable[[str], Iterable[str]],
+              words: List[str]) -> Callable[[], Iterator[str]]:
+    return lambda: (candidate for word in words for candidate in method(word))
+
+
+# Each benchmark sets up outside the timed region and returns the timed run
+def bench_manipulate_word(words):
+    return _per_word(_manipulator().manipulate_word, words)
+
+
+def bench_manipulate_word_repeated(words):
+    # Every word twice, as in merged lists, so half the words hit the cache
+    half = words[:len(words) // 2]
+    return _per_word(_manipulator().manipulate_word, half + half)
+
+
+def bench_leet(words):
+    return _per_word(_manipulator().apply_leet_speak, words)
+
+
+def bench_complex_patterns(words):
+    return _per_word(_manipulator().generate_complex_patterns, words)
+
+
+def bench_word_variations(words):
+    return _per_word(_password_generator(words).generate_word_variations, words)
+
+
+def bench_password_generator(words):
+    generator = _password_generator(words)
+    return lambda: generator.password_generator(10 ** 12)
+
+
+def _pattern_bench(pattern: int) -> Callable[[List[str]], Callable[[], Iterable[str]]]:
+    def bench(words):
+        from worldpasses import iter_passwords
+        return lambda: iter_passwords('en', quotas={pattern: len(words) * PATTERN_QUOTA},
+                                      words=words)
+    return bench
+
+
+BENCHMARKS: Dict[str, Callable[[List[str]], Callable[[], Iterable[str]]]] = {
+    'mixer.manipulate_word': bench_manipulate_word,
+    'mixer.manipulate_word_repeated': bench_manipulate_word_repeated,
+    'mixer.apply_leet_speak': bench_leet,
+    'mixer.generate_complex_patterns': bench_complex_patterns,
+    'passmaster.generate_word_variations': bench_word_variations,
+    'passmaster.password_generator': bench_password_generator,
+    **{f'worldpasses.pattern_{pattern}': _pattern_bench(pattern) for pattern in range(8)},
+}
+
+
+def _offline_fetch(self, url):
+    raise RuntimeError(f"benchmark tried to fetch {url}")
+
+
+def _peak_rss() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _run(name: str, size: int) -> dict:
+    """Run one benchmark in this (fresh) process."""
+    import wordsource
+    wordsource.WordSource.fetch = _offline_fetch
+    run = BENCHMARKS[name](synthetic_words(size))
+    count = nbytes = 0
+    start = time.perf_counter()
+    for candidate in run():
+        count += 1
+        nbytes += len(candidate) + 1
+    seconds = time.perf_counter() - start
+    return {'candidates': count, 'bytes': nbytes, 'seconds': seconds,
+            'rate': count / seconds if seconds else 0.0, 'peak_rss': _peak_rss()}
+
+
+def run_benchmark(name: str, size: int, repeat: int = 1) -> dict:
+    """Best of repeat runs, each in a new process so peak RSS is its own."""
+    context = get_context('spawn')
+    best = None
+    peak = 0
+    for _ in range(repeat):
+        with context.Pool(1) as pool:
+            result = pool.apply(_run, (name, size))
+        peak = max(peak, result['peak_rss'])
+        if best is None or result['rate'] > best['rate']:
+            best = result
+    best['peak_rss'] = peak
+    return best
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict],
+            threshold: float) -> List[str]:
+    """Regressions of results against baseline, one message each."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result['rate'] < base['rate'] * (1 - threshold):
+            regressions.append(f"{key}: {result['rate']:,.0f}/s vs {base['rate']:,.0f}/s "
+                               f"({result['rate'] / base['rate'] - 1:+.0%})")
+        # Ignore a few MB of interpreter noise
+        if result['peak_rss'] > base['peak_rss'] * (1 + threshold) + (4 << 20):
+            regressions.append(f"{key}: peak RSS {result['peak_rss'] >> 20} MB vs "
+                               f"{base['peak_rss'] >> 20} MB")
+    return regressions
+
+
+def format_results(results: Dict[str, dict], baseline: Optional[Dict[str, dict]] = None) -> str:
+    """Render results as a plain-text table."""
+    header = (f"{'Benchmark':<44}{'Candidates':>12}{'Rate/s':>14}{'Change':>9}"
+              f"{'Peak RSS':>11}{'Written':>12}")
+    lines = [header, "-" * len(header)]
+    for key, result in results.items():
+        base = (baseline or {}).get(key)
+        change = f"{result['rate'] / base['rate'] - 1:+.0%}" if base and base['rate'] else "-"
+        lines.append(f"{key:<44}{result['candidates']:>12,}{result['rate']:>14,.0f}{change:>9}"
+                     f"{result['peak_rss'] / (1 << 20):>8.1f} MB"
+                     f"{result['bytes'] / (1 << 20):>9.1f} MB")
+    return "\n".join(lines)
+
+
+def _environment() -> dict:
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'numpy': numpy_version, 'created': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def load_baseline(path: str) -> Tuple[Dict[str, dict], dict]:
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return data['results'], data.get('environment', {})
+
+
+def parse_sizes(spec: str) -> Tuple[int, ...]:
+    try:
+        sizes = tuple(int(size) for size in spec.split(','))
+    except ValueError:
+        sizes = ()
+    if not sizes or min(sizes) < 1:
+        raise argparse.ArgumentTypeError(f"expected comma separated word counts, got {spec!r}")
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the generation hot paths on synthetic wordlists, offline")
+    parser.add_argument("-k", "--filter", default="",
+                        help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--sizes", type=parse_sizes, default=DEFAULT_SIZES,
+                        help="Comma separated wordlist sizes (default: 500,5000)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per benchmark; the fastest counts (default: 3)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="Baseline to compare against, if it exists "
+                             f"(default: {DEFAULT_BASELINE})")
+    parser.add_argument("--save", action="store_true",
+                        help="Store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Slowdown or RSS growth counted as a regression (default: 0.2)")
+    parser.add_argument("--list", action="store_true", help="List the benchmarks and exit")
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    if args.list:
+        print("\n".join(names))
+        return
+    if not names:
+        parser.error(f"no benchmark matches {args.filter!r}")
+
+    baseline = None
+    try:
+        baseline, environment = load_baseline(args.baseline)
+        print(f"Baseline: {args.baseline} (Python {environment.get('python', '?')}, "
+              f"{environment.get('created', '?')})")
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError) as e:
+        parser.error(f"unreadable baseline {args.baseline}: {e}")
+
+    results = {}
+    for size in args.sizes:
+        for name in names:
+            key = f"{name}@{size}"
+            print(f"{key}...", end=" ", file=sys.stderr, flush=True)
+            results[key] = run_benchmark(name, size, args.repeat)
+            print(f"{results[key]['rate']:,.0f}/s", file=sys.stderr)
+    print(format_results(results, baseline))
+
+    if args.save:
+        merged = dict(baseline or {})
+        merged.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'environment': _environment(), 'results': merged}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
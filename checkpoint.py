@@ -0,0 +1,87 @@
+import json
+import os
+import tempfile
+import time
+from typing import Optional
+
+
+class Checkpoint:
+    """Progress of a long generation job, saved to a JSON file every interval
+    seconds so an interrupted run can pick up where it stopped.
+
+    A checkpoint holds the job's settings next to its state. Resuming with
+    different settings (another input, seed or policy) is refused, since the
+    output would no longer match an uninterrupted run. Files are replaced
+    atomically, so a crash while saving leaves the previous checkpoint intact.
+    """
+
+    def __init__(self, path: str, interval: float = 60.0, resume: bool = False):
+        self.path = path
+        self.interval = interval
+        self.resume = resume
+        self.saved_at = time.monotonic()
+
+    def load(self, job: dict) -> Optional[dict]:
+        """State saved for job, or None when not resuming or when the job
+        stopped before its first checkpoint (it then starts over)."""
+        if not self.resume:
+            return None
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            raise ValueError(f"unreadable checkpoint {self.path}: {e}") from None
+        saved = data.get("job", {})
+        changed = sorted(key for key in set(job) | set(saved) if job.get(key) != saved.get(key))
+        if changed:
+            raise ValueError(f"checkpoint {self.path} is for a different job "
+                             f"(changed: {', '.join(changed)})")
+        return data["state"]
+
+    def due(self) -> bool:
+        return time.monotonic() - self.saved_at >= self.interval
+
+    def save(self, job: dict, state: dict):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".checkpoint.", dir=directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"job": job, "state": state, "saved": time.time()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.saved_at = time.monotonic()
+
+    def clear(self):
+        """Remove the checkpoint once the job has finished."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def input_identity(path: str) -> dict:
+    """Fields that tell whether an input file changed between runs."""
+    stat = os.stat(path)
+    return {"input": os.path.abspath(path), "input_size": stat.st_size,
+            "input_mtime": stat.st_mtime_ns}
+
+
+def add_checkpoint_arguments(parser):
+    """Register the checkpoint/resume options shared by the generators."""
+    parser.add_argument("--checkpoint", metavar="FILE",
+                        help="Save progress to FILE periodically (default with --resume: "
+                             "<output>.checkpoint)")
+    parser.add_argument("--checkpoint-every", type=float, default=60, metavar="SECONDS",
+                        help="Seconds between checkpoints (default: 60)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run from its checkpoint")
+
+
+def checkpoint_from_args(args, output_file: Optional[str]) -> Optional[Checkpoint]:
+    """The checkpoint requested on the command line, if any."""
+    if not args.checkpoint and not args.resume:
+        return None
+    if output_file is None or output_file == '-':
+        raise ValueError("checkpoints need an output file, not stdout")
+    return Checkpoint(args.checkpoint or f"{output_file}.checkpoint", args.checkpoint_every,
+                      args.resume)
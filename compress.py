@@ -0,0 +1,89 @@
+import gzip
+import io
+import lzma
+import sys
+from typing import BinaryIO, Optional, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Codec name -> (file extension, magic bytes at the start of a stream)
+CODECS = {
+    'gzip': ('.gz', b'\x1f\x8b'),
+    'xz': ('.xz', b'\xfd7zXZ\x00'),
+    'zstd': ('.zst', b'\x28\xb5\x2f\xfd'),
+}
+# Levels favouring speed, since output is written as fast as it is generated
+DEFAULT_LEVELS = {'gzip': 1, 'xz': 3, 'zstd': 3}
+MAGIC_BYTES = max(len(magic) for _, magic in CODECS.values())
+
+
+def check_codec(codec: str):
+    """Raise ValueError unless codec can be used here."""
+    if codec not in CODECS:
+        raise ValueError(f"unknown compression {codec!r}, expected one of {', '.join(CODECS)}")
+    if codec == 'zstd' and zstandard is None:
+        raise ValueError("zstd compression needs the zstandard package (pip install zstandard)")
+
+
+def codec_for_path(path: Optional[str]) -> Optional[str]:
+    """Codec implied by a file name's extension, if any."""
+    for codec, (extension, _) in CODECS.items():
+        if path and path.endswith(extension):
+            return codec
+    return None
+
+
+def sniff(head: bytes) -> Optional[str]:
+    """Codec of a stream starting with head, or None for plain data."""
+    for codec, (_, magic) in CODECS.items():
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def detect(path: str) -> Optional[str]:
+    """Codec a file is compressed with, from its first bytes."""
+    with open(path, 'rb') as f:
+        return sniff(f.read(MAGIC_BYTES))
+
+
+def open_reader(path: str) -> BinaryIO:
+    """Open a file for binary reading, decompressing it transparently if it
+    is gzip, xz or zstd data; '-' is stdin. Concatenated gzip members, xz
+    streams and zstd frames read as one stream."""
+    if path == '-':
+        stream = sys.stdin.buffer
+        codec = sniff(stream.peek(MAGIC_BYTES)[:MAGIC_BYTES])
+        return stream if codec is None else _decompressor(codec, stream)
+    codec = detect(path)
+    return open(path, 'rb') if codec is None else _decompressor(codec, path)
+
+
+def _decompressor(codec: str, source: Union[str, BinaryIO]) -> BinaryIO:
+    # Given a path the reader owns the file; given a stream it leaves it open
+    check_codec(codec)
+    if codec == 'gzip':
+        return gzip.open(source, 'rb')
+    if codec == 'xz':
+        return lzma.open(source, 'rb')
+    owned = isinstance(source, str)
+    raw = open(source, 'rb') if owned else source
+    reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True,
+                                                        closefd=owned)
+    return io.BufferedReader(reader, 1 << 20)
+
+
+def compressor(codec: str, raw: BinaryIO, level: Optional[int] = None) -> BinaryIO:
+    """A writable stream compressing into raw. Closing it ends the gzip
+    member, xz stream or zstd frame but leaves raw open, so several can be
+    written back to back into one file."""
+    check_codec(codec)
+    level = DEFAULT_LEVELS[codec] if level is None else level
+    if codec == 'gzip':
+        return gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=level, mtime=0)
+    if codec == 'xz':
+        return lzma.LZMAFile(raw, 'wb', preset=level)
+    return zstandard.ZstdCompressor(level=level).stream_writer(raw, closefd=False)
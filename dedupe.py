@@ -0,0 +1,361 @@
+from array import array
+from functools import partial
+from typing import List, Optional, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_MASK64 = (1 << 64) - 1
+_PRIME1 = 0x9E3779B185EBCA87
+_PRIME2 = 0xC2B2AE3D27D4EB4F
+_PRIME3 = 0x165667B19E3779F9
+_PRIME4 = 0x85EBCA77C2B2AE63
+
+
+def _encode(item: Union[str, bytes]) -> bytes:
+    return item.encode('utf-8', 'surrogateescape') if isinstance(item, str) else item
+
+
+def stable_hash(item: Union[str, bytes], salt: int) -> int:
+    """Keyed signed 64-bit hash of item that, unlike hash(), is the same in
+    every process. The UTF-8 bytes are mixed 8 at a time with xxHash64-style
+    rounds, then avalanched; stable_hashes is the batched form."""
+    data = _encode(item)
+    h = (salt ^ (len(data) * _PRIME1)) & _MASK64
+    for i in range(0, len(data), 8):
+        m = int.from_bytes(data[i:i + 8], 'little') * _PRIME2 & _MASK64
+        m = (m ^ (m >> 31)) * _PRIME1 & _MASK64
+        h ^= m
+        h = ((((h << 27) | (h >> 37)) & _MASK64) * _PRIME1 + _PRIME4) & _MASK64
+    h = (h ^ (h >> 33)) * _PRIME2 & _MASK64
+    h = (h ^ (h >> 29)) * _PRIME3 & _MASK64
+    h ^= h >> 32
+    return h - (1 << 64) if h >> 63 else h
+
+
+def stable_hashes(items: List[Union[str, bytes]], salt: int):
+    """stable_hash of every item: an int64 ndarray with numpy, else a list."""
+    if np is None:
+        return [stable_hash(item, salt) for item in items]
+    if not items:
+        return np.zeros(0, dtype=np.int64)
+    data = [_encode(item) for item in items]
+    lengths = np.fromiter(map(len, data), dtype=np.uint64, count=len(data))
+    width = (int(lengths.max()) + 7) // 8 * 8
+    # Zero-padded rows of little-endian 64-bit lanes; lanes past an item's end
+    # leave its hash alone, so it does not depend on the rest of the batch
+    lanes = np.array(data, dtype=f'S{max(width, 8)}').view('<u8').reshape(len(data), -1)
+    used = (lengths + np.uint64(7)) // np.uint64(8)
+    u = np.uint64
+    with np.errstate(over='ignore'):
+        h = u(salt & _MASK64) ^ (lengths * u(_PRIME1))
+        for i in range(width // 8):
+            m = lanes[:, i] * u(_PRIME2)
+            m = (m ^ (m >> u(31))) * u(_PRIME1)
+            mixed = h ^ m
+            mixed = ((mixed << u(27)) | (mixed >> u(37))) * u(_PRIME1) + u(_PRIME4)
+            h = np.where(used > i, mixed, h)
+        h = (h ^ (h >> u(33))) * u(_PRIME2)
+        h = (h ^ (h >> u(29))) * u(_PRIME3)
+        h ^= h >> u(32)
+    return h.view(np.int64)
+
+
+def _hash_function(salt: Optional[int]):
+    return hash if salt is None else partial(stable_hash, salt=salt)
+
+
+class CompactSet:
+    """Set of candidates stored as 64-bit hash fingerprints in one flat array.
+
+    Fingerprints live in an array('q') table with open addressing and linear
+    probing at 8 bytes per slot. The load stays between 0.375 (right after a
+    doubling) and 0.75, so an entry costs 10.7-21 bytes: 4-8x smaller than
+    the ~90 bytes a short str costs inside a set, not a fixed ratio. No
+    candidate string is kept alive. add_many() probes a whole batch at once
+    with numpy when it is installed.
+
+    It is not exact: two distinct candidates with equal 64-bit hashes count
+    as one, and the later is dropped as a duplicate, the same failure mode as
+    a Bloom filter false positive. With n entries the chance of any such
+    collision is about n^2 / 2^65: 3e-4 for 100M candidates, 3e-8 for 1M.
+
+    Items are hashed with hash(), which Python salts per process, so which
+    items collide (and a set's fingerprints) differ from run to run. Given a
+    salt, stable_hash is used instead: slower, but the same in every process,
+    so a run can be repeated or a set rebuilt on resume with the same result.
+    """
+
+    MAX_LOAD = 0.75
+
+    def __init__(self, capacity: int = 0, salt: Optional[int] = None):
+        self.salt = salt
+        self.hash = _hash_function(salt)
+        self.count = 0
+        self._allocate(self.table_slots(capacity))
+
+    @classmethod
+    def table_slots(cls, capacity: int) -> int:
+        size = 16
+        while size * cls.MAX_LOAD < capacity:
+            size <<= 1
+        return size
+
+    @classmethod
+    def table_bytes(cls, capacity: int) -> int:
+        """Memory of a table sized for capacity entries."""
+        return cls.table_slots(capacity) * 8
+
+    def _allocate(self, size: int):
+        self.mask = size - 1
+        self.limit = int(size * self.MAX_LOAD)
+        self.slots = array('q', bytes(8 * size))
+
+    def _grow(self, needed: int):
+        old = self.slots
+        self._allocate(self.table_slots(needed))
+        if np is not None:
+            keys = np.frombuffer(old, dtype=np.int64)
+            self._insert_batch(keys[keys != 0])
+            return
+        slots, mask = self.slots, self.mask
+        for h in old:
+            if h:
+                i = h & mask
+                while slots[i]:
+                    i = (i + 1) & mask
+                slots[i] = h
+
+    def _insert_batch(self, keys):
+        """Insert distinct non-zero fingerprints (an int64 ndarray), returning
+        a bool array marking the ones that were not present before."""
+        slots = np.frombuffer(self.slots, dtype=np.int64)
+        mask = self.mask
+        new = np.zeros(len(keys), dtype=bool)
+        pending = np.arange(len(keys))
+        pos = keys & mask
+        while pending.size:
+            k = keys[pending]
+            p = pos[pending]
+            v = slots[p]
+            empty = v == 0
+            if empty.any():
+                # Keys racing for one empty slot: whichever write landed wins,
+                # the rest see a different key on the re-read and probe on
+                slots[p[empty]] = k[empty]
+                v = slots[p]
+            busy = v != k
+            new[pending[empty & ~busy]] = True
+            pending = pending[busy]
+            pos[pending] = (p[busy] + 1) & mask
+        return new
+
+    def add(self, item: str) -> bool:
+        """Add item, returning True if it was not present before."""
+        h = self.hash(item) or 1
+        slots, mask = self.slots, self.mask
+        i = h & mask
+        v = slots[i]
+        while v:
+            if v == h:
+                return False
+            i = (i + 1) & mask
+            v = slots[i]
+        slots[i] = h
+        self.count += 1
+        if self.count > self.limit:
+            self._grow(self.count + 1)
+        return True
+
+    def add_many(self, items: List[str]) -> List[str]:
+        """Add items, returning those that were not present before, in order."""
+        if np is None or len(items) < 64:
+            return [item for item in items if self.add(item)]
+        if self.salt is None:
+            hashes = np.fromiter(map(hash, items), dtype=np.int64, count=len(items))
+        else:
+            hashes = stable_hashes(items, self.salt)
+        hashes[hashes == 0] = 1
+        keys, first = np.unique(hashes, return_index=True)
+        if self.count + len(keys) > self.limit:
+            self._grow(self.count + len(keys))
+        new = self._insert_batch(keys)
+        self.count += int(np.count_nonzero(new))
+        return [items[i] for i in np.sort(first[new]).tolist()]
+
+    def __contains__(self, item: str) -> bool:
+        h = self.hash(item) or 1
+        slots, mask = self.slots, self.mask
+        i = h & mask
+        v = slots[i]
+        while v:
+            if v == h:
+                return True
+            i = (i + 1) & mask
+            v = slots[i]
+        return False
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.slots) * 8
+
+    def fingerprints(self):
+        """The stored 64-bit fingerprints, in table order."""
+        if np is not None:
+            keys = np.frombuffer(self.slots, dtype=np.int64)
+            return keys[keys != 0]
+        return [h for h in self.slots if h]
+
+
+# 16-bit hash slice -> 64-bit mask with up to four bits set
+_MASKS = None
+
+
+def _block_masks():
+    global _MASKS
+    if _MASKS is None:
+        _MASKS = [(1 << (i & 63)) | (1 << ((i >> 4) & 63)) | (1 << ((i >> 8) & 63))
+                  | (1 << ((i >> 10) & 63)) for i in range(1 << 16)]
+    return _MASKS
+
+
+class BloomFilter:
+    """Fixed-size probabilistic set for deduplicating very large candidate streams.
+
+    This is a blocked Bloom filter: each item sets up to eight bits inside a
+    single 64-bit word, so an insert costs one hash and one array update. Memory
+    is bits_per_item * capacity bits, optionally capped by max_bytes. A false
+    positive makes a new candidate look like a duplicate and it is dropped; a
+    real duplicate is never let through. Items are hashed with hash(), so
+    which items are dropped differs from process to process, unless a salt
+    selects stable_hash as for CompactSet.
+    """
+
+    def __init__(self, capacity: int, bits_per_item: int = 16, max_bytes: Optional[int] = None,
+                 salt: Optional[int] = None):
+        self.salt = salt
+        self.hash = _hash_function(salt)
+        nbytes = max(1, capacity) * bits_per_item // 8
+        if max_bytes:
+            nbytes = min(nbytes, max_bytes)
+        # An odd block count keeps h % blocks from ignoring high hash bits
+        self.blocks = max(1, nbytes // 8) | 1
+        self.words = array('Q', bytes(8 * self.blocks))
+        self.masks = _block_masks()
+        self.count = 0
+
+    def _locate(self, item: str):
+        h = self.hash(item)
+        return h % self.blocks, self.masks[(h >> 20) & 0xFFFF] | self.masks[(h >> 40) & 0xFFFF]
+
+    def __contains__(self, item: str) -> bool:
+        index, mask = self._locate(item)
+        return self.words[index] & mask == mask
+
+    def add(self, item: str) -> bool:
+        """Add item, returning True if it was (probably) not present before."""
+        return self._add_hash(self.hash(item))
+
+    def _add_hash(self, h: int) -> bool:
+        index = h % self.blocks
+        mask = self.masks[(h >> 20) & 0xFFFF] | self.masks[(h >> 40) & 0xFFFF]
+        words = self.words
+        old = words[index]
+        if old & mask == mask:
+            return False
+        words[index] = old | mask
+        self.count += 1
+        return True
+
+    def add_many(self, items: List[str]) -> List[str]:
+        """Add items, returning those that were (probably) not present before, in order."""
+        if self.salt is None:
+            return [item for item in items if self.add(item)]
+        hashes = stable_hashes(items, self.salt)
+        if np is not None:
+            hashes = hashes.tolist()
+        return [item for item, h in zip(items, hashes) if self._add_hash(h)]
+
+    def add_hashes(self, hashes):
+        """Add items by their fingerprints, e.g. those of a CompactSet with the
+        same salt."""
+        if np is None:
+            masks, words, blocks = self.masks, self.words, self.blocks
+            for h in hashes:
+                words[h % blocks] |= masks[(h >> 20) & 0xFFFF] | masks[(h >> 40) & 0xFFFF]
+        else:
+            h = np.asarray(hashes, dtype=np.int64)
+            masks = np.array(self.masks, dtype=np.uint64)
+            # numpy's % and >> on int64 match Python's for negative hashes
+            np.bitwise_or.at(np.frombuffer(self.words, dtype=np.uint64), h % self.blocks,
+                             masks[(h >> 20) & 0xFFFF] | masks[(h >> 40) & 0xFFFF])
+        self.count += len(hashes)
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        return self.blocks * 8
+
+
+class BoundedSet:
+    """Duplicate filter that never outgrows max_bytes.
+
+    It is a CompactSet, growing on demand, while the table fits in
+    max_bytes. The first add that would grow it past that swaps it for a
+    BloomFilter of max_bytes seeded with every fingerprint so far. Before the
+    swap only a 64-bit hash collision can drop an item (see CompactSet);
+    after it, false positives may drop a few new items (is_exact tells which
+    mode it is in). A salt is passed on to both, see CompactSet.
+    """
+
+    def __init__(self, max_bytes: int, salt: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.salt = salt
+        self.filter = CompactSet(salt=salt)
+
+    @property
+    def is_exact(self) -> bool:
+        return isinstance(self.filter, CompactSet)
+
+    def _make_room(self, n: int):
+        table = self.filter
+        if (self.is_exact and table.count + n > table.limit
+                and CompactSet.table_bytes(table.count + n) > self.max_bytes):
+            # 16 bits per item, so the filter takes the whole budget
+            bloom = BloomFilter(self.max_bytes // 2, max_bytes=self.max_bytes, salt=self.salt)
+            bloom.add_hashes(table.fingerprints())
+            self.filter = bloom
+
+    def add(self, item: str) -> bool:
+        self._make_room(1)
+        return self.filter.add(item)
+
+    def add_many(self, items: List[str]) -> List[str]:
+        self._make_room(len(items))
+        return self.filter.add_many(items)
+
+    def __contains__(self, item: str) -> bool:
+        return item in self.filter
+
+    def __len__(self) -> int:
+        return len(self.filter)
+
+    @property
+    def nbytes(self) -> int:
+        return self.filter.nbytes
+
+
+def make_dedupe(expected: int, method: str = 'auto', max_bytes: int = 512 * 1024 * 1024):
+    """Duplicate filter for about expected candidates: a CompactSet (lossless
+    barring 64-bit hash collisions) while its table fits in max_bytes, a Bloom
+    filter of max_bytes beyond."""
+    if method == 'set' or (method == 'auto' and CompactSet.table_bytes(expected) <= max_bytes):
+        return CompactSet(expected)
+    return BloomFilter(expected, max_bytes=max_bytes)
@@ -0,0 +1,79 @@
+import math
+from typing import List, Optional
+
+
+class Estimate:
+    """Predicted output of one pattern or transformation stage."""
+
+    def __init__(self, name: str, generated: float, unique: Optional[float] = None,
+                 avg_length: Optional[float] = None, keyspace: Optional[float] = None):
+        self.name = name
+        self.generated = generated
+        self.unique = unique
+        self.avg_length = avg_length
+        self.keyspace = keyspace
+
+    @property
+    def dedupe_ratio(self) -> Optional[float]:
+        """Fraction of generated candidates expected to survive deduplication."""
+        if self.unique is None or not self.generated:
+            return None
+        if math.isinf(self.generated):
+            return 0.0
+        return self.unique / self.generated
+
+    @property
+    def output_bytes(self) -> Optional[float]:
+        """Expected size on disk, one candidate per line."""
+        if self.unique is None or self.avg_length is None:
+            return None
+        return self.unique * (self.avg_length + 1)
+
+
+def expected_draws(space: float, unique: float) -> float:
+    """Expected uniform random draws needed to collect `unique` distinct values
+    from a space of `space` values (coupon collector)."""
+    if unique <= 0:
+        return 0.0
+    if unique > space:
+        return math.inf
+    if unique == space:
+        return space * (math.log(space) + 0.5772156649)
+    return -space * math.log1p(-unique / space)
+
+
+def format_count(n: Optional[float]) -> str:
+    if n is None:
+        return "-"
+    if math.isinf(n):
+        return "unreachable"
+    if n >= 1e12:
+        return f"{n:.2e}"
+    return f"{round(n):,}"
+
+
+def format_bytes(n: Optional[float]) -> str:
+    if n is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if n < 1024 or unit == "TB":
+            return f"{n:.1f} {unit}" if unit != "B" else f"{int(n)} B"
+        n /= 1024
+
+
+def format_report(title: str, estimates: List[Estimate], total: Estimate) -> str:
+    """Render estimates as a plain-text table."""
+    # Counts below 1e12 print in full, up to 15 characters, so each count
+    # column keeps at least one space of separation
+    header = f"{'Stage':<32}{'Generated':>16}{'Unique':>16}{'Kept':>8}{'Keyspace':>16}{'Output':>12}"
+    lines = [title, header, "-" * len(header)]
+    for est in estimates + [total]:
+        if est is total:
+            lines.append("-" * len(header))
+        ratio = est.dedupe_ratio
+        lines.append(
+            f"{est.name:<32}{format_count(est.generated):>16}{format_count(est.unique):>16}"
+            f"{'-' if ratio is None else f'{ratio:.1%}':>8}"
+            f"{format_count(est.keyspace):>16}{format_bytes(est.output_bytes):>12}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,184 @@
+import heapq
+import os
+import tempfile
+from itertools import groupby
+from typing import BinaryIO, Iterable, Iterator, List, Optional
+
+# Rough cost of one short str held in a set (object header + hash slot)
+ENTRY_OVERHEAD = 80
+# Rough cost of one short bytes object held in a list
+LINE_OVERHEAD = 48
+
+
+def merge_unique(iterables: List[Iterable]) -> Iterator:
+    """Merge sorted iterables into one sorted stream without repeats."""
+    for item, _ in groupby(heapq.merge(*iterables)):
+        yield item
+
+
+class ExternalSorter:
+    """Collect lines under a memory budget, spilling sorted runs to disk.
+
+    Run files stay in runs until a merge has consumed them completely, so an
+    interrupted merge can be cleaned up. With keep_merged, merging never
+    removes its input runs, so any list of runs taken earlier (e.g. by a
+    checkpoint) stays valid; the caller then removes tmp_dir when done.
+    """
+
+    def __init__(self, memory_limit: int = 512 * 1024 * 1024,
+                 tmp_dir: Optional[str] = None, max_open: int = 256):
+        self.memory_limit = memory_limit
+        self.tmp_dir = tmp_dir
+        self.max_open = max_open
+        self.buffer = set()
+        self.buffer_bytes = 0
+        self.runs: List[str] = []
+        self.keep_merged = False
+
+    def add(self, items: Iterable[str]):
+        """Add items to the in-memory buffer, spilling when over budget."""
+        buffer = self.buffer
+        for item in items:
+            if item not in buffer:
+                buffer.add(item)
+                self.buffer_bytes += ENTRY_OVERHEAD + len(item)
+        if self.buffer_bytes >= self.memory_limit:
+            self.spill()
+
+    def spill(self):
+        """Write the current buffer to disk as a sorted run."""
+        if not self.buffer:
+            return
+        self.runs.append(self._write_run(sorted(f"{item}\n" for item in self.buffer)))
+        self.buffer = set()
+        self.buffer_bytes = 0
+
+    def _write_run(self, lines: Iterable[str]) -> str:
+        fd, path = tempfile.mkstemp(prefix="run_", suffix=".txt", dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', errors='surrogateescape',
+                           buffering=1 << 20) as f:
+                f.writelines(lines)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path
+
+    def _merge_runs(self, runs: List[str]) -> Iterator[str]:
+        files = [open(path, encoding='utf-8', errors='surrogateescape', buffering=1 << 16)
+                 for path in runs]
+        try:
+            yield from merge_unique(files)
+        finally:
+            for f in files:
+                f.close()
+        if not self.keep_merged:
+            for path in runs:
+                os.remove(path)
+
+    def collapse(self):
+        """Merge runs in groups until they can all be kept open at once."""
+        while len(self.runs) > self.max_open:
+            group = self.runs[:self.max_open]
+            merged = self._write_run(self._merge_runs(group))
+            self.runs = self.runs[self.max_open:] + [merged]
+
+    def merge(self) -> Iterator[str]:
+        """Yield every collected item exactly once, in sorted order."""
+        if not self.runs:
+            lines = sorted(f"{item}\n" for item in self.buffer)
+            self.buffer = set()
+            self.buffer_bytes = 0
+            for line in lines:
+                yield line[:-1]
+            return
+
+        self.spill()
+        self.collapse()
+        for line in self._merge_runs(self.runs):
+            yield line[:-1]
+        self.runs = []
+
+    def cleanup(self, keep: Iterable[str] = ()):
+        """Remove any spill files that were not consumed by merge(), except keep."""
+        keep = set(keep)
+        for path in self.runs:
+            if path not in keep and os.path.exists(path):
+                os.remove(path)
+        self.runs = []
+        self.buffer = set()
+        self.buffer_bytes = 0
+
+
+class LineSorter:
+    """External sort of raw byte lines, each ending in b'\n', without repeats.
+
+    Unlike ExternalSorter nothing is decoded or hashed line by line: blocks of
+    lines are appended to a list, sorted with bytes comparisons and written
+    as runs, so the cost is dominated by reading and writing the runs.
+    """
+
+    def __init__(self, memory_limit: int = 512 * 1024 * 1024,
+                 tmp_dir: Optional[str] = None, max_open: int = 256):
+        self.memory_limit = memory_limit
+        self.tmp_dir = tmp_dir
+        self.max_open = max_open
+        self.buffer: List[bytes] = []
+        self.buffer_bytes = 0
+        self.runs: List[str] = []
+
+    def add(self, lines: List[bytes]):
+        """Add a block of lines, spilling when over budget."""
+        self.buffer.extend(lines)
+        self.buffer_bytes += sum(map(len, lines)) + LINE_OVERHEAD * len(lines)
+        if self.buffer_bytes >= self.memory_limit:
+            self.spill()
+
+    def _sorted_buffer(self) -> List[bytes]:
+        self.buffer.sort()
+        lines = [line for line, _ in groupby(self.buffer)]
+        self.buffer = []
+        self.buffer_bytes = 0
+        return lines
+
+    def spill(self):
+        if self.buffer:
+            self.runs.append(self._write_run(self._sorted_buffer()))
+
+    def _write_run(self, lines: Iterable[bytes]) -> str:
+        fd, path = tempfile.mkstemp(prefix="run_", suffix=".txt", dir=self.tmp_dir)
+        with os.fdopen(fd, 'wb', buffering=1 << 20) as f:
+            f.writelines(lines)
+        return path
+
+    def _merge_runs(self, runs: List[str]) -> Iterator[bytes]:
+        files: List[BinaryIO] = [open(path, 'rb', buffering=1 << 20) for path in runs]
+        try:
+            yield from merge_unique(files)
+        finally:
+            for f in files:
+                f.close()
+            for path in runs:
+                os.remove(path)
+
+    def merge(self) -> Iterator[bytes]:
+        """Yield every collected line exactly once, in sorted order."""
+        if not self.runs:
+            yield from self._sorted_buffer()
+            return
+
+        self.spill()
+        while len(self.runs) > self.max_open:
+            group, self.runs = self.runs[:self.max_open], self.runs[self.max_open:]
+            self.runs.append(self._write_run(self._merge_runs(group)))
+
+        runs, self.runs = self.runs, []
+        yield from self._merge_runs(runs)
+
+    def cleanup(self):
+        for path in self.runs:
+            if os.path.exists(path):
+                os.remove(path)
+        self.runs = []
+        self.buffer = []
+        self.buffer_bytes = 0
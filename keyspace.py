@@ -0,0 +1,155 @@
+from bisect import bisect_right
+from itertools import product
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+# Largest run of trailing positions that is pre-expanded for fast enumeration
+SUFFIX_BLOCK = 1 << 16
+
+
+class Mask:
+    """Exact keyspace of fixed-length candidates, one token set per position.
+
+    Candidates are ordered like an odometer: the last position changes fastest.
+    nth() decodes any index directly, index_of() is its inverse, and
+    iter_range() walks a contiguous slice without touching earlier candidates.
+    """
+
+    def __init__(self, positions: Sequence[Sequence[str]]):
+        self.positions = [tuple(tokens) for tokens in positions]
+        self.radices = [len(tokens) for tokens in self.positions]
+        self.size = 1
+        for radix in self.radices:
+            self.size *= radix
+        self.length = len(self.positions)
+        self.lookup = [{token: digit for digit, token in enumerate(tokens)}
+                       for tokens in self.positions]
+
+        # Split into a prefix decoded per step and a suffix block expanded once
+        split, block = self.length, 1
+        while split > 0 and block * self.radices[split - 1] <= SUFFIX_BLOCK:
+            split -= 1
+            block *= self.radices[split]
+        self.split = split
+        self.block = block
+        self._suffixes = None
+
+    @classmethod
+    def from_segments(cls, segments: Sequence[Tuple[str, int]]) -> "Mask":
+        """Build a mask from (charset, length) segments, e.g. [(letters, 3), (digits, 3)]."""
+        positions = []
+        for charset, length in segments:
+            positions.extend([charset] * length)
+        return cls(positions)
+
+    @property
+    def suffixes(self) -> List[str]:
+        if self._suffixes is None:
+            self._suffixes = [''.join(t) for t in product(*self.positions[self.split:])]
+        return self._suffixes
+
+    def _decode(self, index: int, stop: int) -> str:
+        tokens = []
+        for pos in range(stop - 1, -1, -1):
+            index, digit = divmod(index, self.radices[pos])
+            tokens.append(self.positions[pos][digit])
+        return ''.join(reversed(tokens))
+
+    def nth(self, index: int) -> str:
+        """Candidate at index, without generating the ones before it."""
+        if not 0 <= index < self.size:
+            raise IndexError(f"index {index} outside keyspace of {self.size}")
+        return self._decode(index, self.length)
+
+    def index_of(self, candidate: str) -> Optional[int]:
+        """Index of candidate in this mask, or None if it is not part of it.
+
+        Only defined for masks whose tokens are single characters.
+        """
+        if len(candidate) != self.length:
+            return None
+        index = 0
+        for char, lookup, radix in zip(candidate, self.lookup, self.radices):
+            digit = lookup.get(char)
+            if digit is None:
+                return None
+            index = index * radix + digit
+        return index
+
+    def iter_range(self, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+        """Yield the candidates with index in [start, stop)."""
+        stop = self.size if stop is None else min(stop, self.size)
+        if start >= stop:
+            return
+        suffixes = self.suffixes
+        block = self.block
+        first, offset = divmod(start, block)
+        last, end = divmod(stop, block)
+        for prefix_index in range(first, last + 1):
+            lo = offset if prefix_index == first else 0
+            hi = end if prefix_index == last else block
+            if lo >= hi:
+                continue
+            prefix = self._decode(prefix_index, self.split)
+            if lo == 0 and hi == block:
+                yield from [prefix + suffix for suffix in suffixes]
+            else:
+                yield from [prefix + suffix for suffix in suffixes[lo:hi]]
+
+    def __iter__(self) -> Iterator[str]:
+        return self.iter_range()
+
+
+class MaskUnion:
+    """Several disjoint masks addressed as one keyspace, in the order given."""
+
+    def __init__(self, masks: Sequence[Mask]):
+        self.masks = list(masks)
+        self.offsets = []
+        self.size = 0
+        for mask in self.masks:
+            self.offsets.append(self.size)
+            self.size += mask.size
+        self.by_length = {}
+        for mask, offset in zip(self.masks, self.offsets):
+            self.by_length.setdefault(mask.length, []).append((mask, offset))
+
+    @classmethod
+    def from_shapes(cls, shapes: Sequence[Sequence[Tuple[str, int]]]) -> "MaskUnion":
+        return cls([Mask.from_segments(shape) for shape in shapes])
+
+    def _locate(self, index: int) -> Tuple[int, int]:
+        if not 0 <= index < self.size:
+            raise IndexError(f"index {index} outside keyspace of {self.size}")
+        i = bisect_right(self.offsets, index) - 1
+        return i, index - self.offsets[i]
+
+    def nth(self, index: int) -> str:
+        """Candidate at index, without generating the ones before it."""
+        i, local = self._locate(index)
+        return self.masks[i].nth(local)
+
+    def index_of(self, candidate: str) -> Optional[int]:
+        """Index of candidate in the union, or None if no mask contains it."""
+        for mask, offset in self.by_length.get(len(candidate), ()):
+            local = mask.index_of(candidate)
+            if local is not None:
+                return offset + local
+        return None
+
+    def iter_range(self, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+        """Yield the candidates with index in [start, stop)."""
+        stop = self.size if stop is None else min(stop, self.size)
+        if start >= stop:
+            return
+        i, local = self._locate(start)
+        remaining = stop - start
+        while remaining > 0:
+            mask = self.masks[i]
+            count = min(mask.size - local, remaining)
+            yield from mask.iter_range(local, local + count)
+            remaining -= count
+            i += 1
+            local = 0
+
+    def __iter__(self) -> Iterator[str]:
+        return self.iter_range()
@@ -0,0 +1,61 @@
+from itertools import combinations, islice, product
+from typing import Dict, Iterator, List, Optional
+
+
+class LeetEngine:
+    """Lazy per-position leet speak enumerator.
+
+    Every character that has an entry in the leet map (matched case-insensitively)
+    can independently keep its original form or take one of its replacements.
+    Variants are produced in a fixed order: the unmodified word first, then all
+    single substitutions, then pairs, and so on. Within one substitution count,
+    positions are taken left to right and replacements in leet map order.
+    """
+
+    def __init__(self, leet_map: Dict[str, List[str]], max_variants: Optional[int] = None):
+        self.leet_map = leet_map
+        self.max_variants = max_variants
+
+    def _alternatives(self, word: str) -> List[tuple]:
+        """Return (position, replacements) for every substitutable character."""
+        slots = []
+        for pos, char in enumerate(word):
+            replacements = self.leet_map.get(char.lower())
+            if replacements:
+                alternatives = [r for r in replacements if r != char]
+                if alternatives:
+                    slots.append((pos, alternatives))
+        return slots
+
+    def _limit(self, max_variants: Optional[int]) -> Optional[int]:
+        limit = self.max_variants if max_variants is None else max_variants
+        return limit if limit and limit > 0 else None
+
+    def count(self, word: str, max_variants: Optional[int] = None) -> int:
+        """Number of variants variants() will yield for word, without generating them."""
+        total = 1
+        for _, alternatives in self._alternatives(word):
+            total *= len(alternatives) + 1
+        limit = self._limit(max_variants)
+        return total if limit is None else min(total, limit)
+
+    def _enumerate(self, word: str) -> Iterator[str]:
+        slots = self._alternatives(word)
+        yield word
+        chars = list(word)
+        for k in range(1, len(slots) + 1):
+            for chosen in combinations(slots, k):
+                positions = [pos for pos, _ in chosen]
+                for replacements in product(*(alts for _, alts in chosen)):
+                    for pos, replacement in zip(positions, replacements):
+                        chars[pos] = replacement
+                    yield ''.join(chars)
+                for pos in positions:
+                    chars[pos] = word[pos]
+
+    def variants(self, word: str, max_variants: Optional[int] = None) -> Iterator[str]:
+        """Lazily yield leet variants of word, the word itself first."""
+        limit = self._limit(max_variants)
+        if limit is None:
+            return self._enumerate(word)
+        return islice(self._enumerate(word), limit)
@@ -0,0 +1,79 @@
+import sys
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Bytes per entry besides the word and the stored text: the (name, word) key
+# tuple plus the OrderedDict slot and link, roughly
+ENTRY_OVERHEAD = 160
+
+
+class CacheCounters:
+    """Lookups of one memoized function: hits, misses and entries evicted."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+class LRUCache:
+    """Least recently used memo of per-word candidate lists under a byte budget.
+
+    Several deterministic functions of a word can share one cache and its
+    budget, each under its own name (see memoize); lookups are counted per
+    name. A result is kept as a single newline-joined string, several times
+    smaller than a tuple of short strings, so candidates must be non-empty
+    and free of newlines, as wordlist lines are. The budget is approximate:
+    entry sizes come from sys.getsizeof plus a fixed overhead.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: 'OrderedDict[tuple, str]' = OrderedDict()
+        self.nbytes = 0
+        self.counters: Dict[str, CacheCounters] = {}
+
+    @staticmethod
+    def entry_bytes(word: str, text: str) -> int:
+        return sys.getsizeof(word) + sys.getsizeof(text) + ENTRY_OVERHEAD
+
+    def memoize(self, name: str,
+                function: Callable[[str], Iterable[str]]) -> Callable[[str], List[str]]:
+        """function behind the cache; the wrapper returns a list."""
+        counters = self.counters.setdefault(name, CacheCounters())
+        entries = self.entries
+
+        def cached(word: str) -> List[str]:
+            key = (name, word)
+            text = entries.get(key)
+            if text is not None:
+                entries.move_to_end(key)
+                counters.hits += 1
+                return text.split('\n') if text else []
+            counters.misses += 1
+            values = list(function(word))
+            self._add(key, '\n'.join(values))
+            return values
+        return cached
+
+    def _add(self, key: tuple, text: str):
+        size = self.entry_bytes(key[1], text)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = text
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            (name, word), evicted = self.entries.popitem(last=False)
+            self.nbytes -= self.entry_bytes(word, evicted)
+            self.counters[name].evictions += 1
+
+    def drain(self) -> Dict[str, Tuple[int, int, int]]:
+        """(hits, misses, evictions) per name since the last drain; entries stay."""
+        drained = {}
+        for name, counters in self.counters.items():
+            drained[name] = (counters.hits, counters.misses, counters.evictions)
+            counters.hits = counters.misses = counters.evictions = 0
+        return drained
+
+    def __len__(self) -> int:
+        return len(self.entries)
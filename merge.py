@@ -0,0 +1,219 @@
+import argparse
+import sys
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator, List, Optional
+
+from compress import open_reader
+from dedupe import BoundedSet
+from extsort import LineSorter, merge_unique
+from output import ChunkedOutput, add_output_arguments, handle_broken_pipe, output_format_from_args
+
+READ_BLOCK = 1 << 20
+
+
+def open_input(path: str) -> BinaryIO:
+    """Open a candidate file, possibly compressed, for binary reading; '-' is stdin."""
+    return open_reader(path)
+
+
+def _clean(lines: List[bytes], crlf: bool) -> List[bytes]:
+    if crlf:
+        lines = [line[:-1] if line.endswith(b'\r') else line for line in lines]
+    return [line + b'\n' for line in lines if line]
+
+
+def read_blocks(path: str) -> Iterator[List[bytes]]:
+    """Non-empty lines of a candidate file in blocks, each line as bytes ending
+    in a single b'\\n'.
+
+    The file is read in large blocks and split in C. Lines are kept byte-exact
+    apart from the line ending, so lists written with CRLF merge with the rest.
+    """
+    f = open_input(path)
+    try:
+        rest = b''
+        while True:
+            data = f.read(READ_BLOCK)
+            if not data:
+                break
+            lines = (rest + data).split(b'\n')
+            rest = lines.pop()
+            yield _clean(lines, b'\r' in data)
+        if rest:
+            yield _clean([rest], True)
+    finally:
+        if f is not sys.stdin.buffer:
+            f.close()
+
+
+def read_lines(path: str) -> Iterator[bytes]:
+    for block in read_blocks(path):
+        yield from block
+
+
+def sorted_unique(paths: List[str], presorted: bool = False, memory_limit: int = 512 * 1024 * 1024,
+                  tmp_dir: Optional[str] = None, stats: Optional[dict] = None,
+                  sorters: Optional[List[LineSorter]] = None) -> Iterator[bytes]:
+    """Every distinct line of the inputs once, in byte order.
+
+    Presorted inputs are merged directly with no memory or temp files;
+    otherwise the lines go through an external sort.
+    """
+    if presorted:
+        return merge_unique([_counted(read_lines(path), stats) for path in paths])
+    sorter = LineSorter(memory_limit, tmp_dir)
+    if sorters is not None:
+        sorters.append(sorter)
+    for path in paths:
+        for block in read_blocks(path):
+            if stats is not None:
+                stats['read'] += len(block)
+            sorter.add(block)
+    return sorter.merge()
+
+
+def _counted(lines: Iterable[bytes], stats: Optional[dict]) -> Iterator[bytes]:
+    if stats is None:
+        yield from lines
+        return
+    for line in lines:
+        stats['read'] += 1
+        yield line
+
+
+def subtract_sorted(lines: Iterable[bytes], excluded: Iterable[bytes]) -> Iterator[bytes]:
+    """Sorted lines that do not occur in the sorted excluded lines (merge join)."""
+    excluded = iter(excluded)
+    current = next(excluded, None)
+    for line in lines:
+        while current is not None and current < line:
+            current = next(excluded, None)
+        if line != current:
+            yield line
+
+
+def unique_unsorted(paths: List[str], seen: BoundedSet, excluded: Optional[BoundedSet] = None,
+                    stats: Optional[dict] = None) -> Iterator[bytes]:
+    """First occurrence of every line in input order, minus excluded ones."""
+    for path in paths:
+        for block in read_blocks(path):
+            if stats is not None:
+                stats['read'] += len(block)
+            if excluded is not None:
+                block = [line for line in block if line not in excluded]
+            yield from seen.add_many(block)
+
+
+def write_lines(output: BinaryIO, lines: Iterable[bytes], batch_size: int = 65536) -> int:
+    """Write lines to a binary stream in large batches, returning the count."""
+    count = 0
+    iterator = iter(lines)
+    while True:
+        block = list(islice(iterator, batch_size))
+        if not block:
+            return count
+        output.write(b''.join(block))
+        count += len(block)
+
+
+def merge_candidates(paths: List[str], output: BinaryIO, subtract: Optional[List[str]] = None,
+                     presorted: bool = False, subtract_presorted: bool = False,
+                     unsorted: bool = False, memory_limit: int = 512 * 1024 * 1024,
+                     tmp_dir: Optional[str] = None) -> dict:
+    """Merge candidate files into output (a binary stream), dropping duplicates
+    across all inputs and any line found in the subtract lists.
+
+    By default the output is sorted: inputs are external-sorted (or merged
+    directly when presorted) and the subtract lists are removed with a merge
+    join, so memory stays bounded and nothing is hashed per line. A sorted
+    merge output can be passed back with subtract_presorted as an on-disk
+    index of lines already tried. With unsorted, lines keep their input
+    order, e.g. for ranked generator output. Dedupe and subtraction then use
+    a BoundedSet of memory_limit bytes each: a fingerprint table, lossless
+    barring 64-bit hash collisions, while it fits, then a Bloom filter that
+    may drop a few unique lines.
+    """
+    subtract = subtract or []
+    stats = {'read': 0, 'written': 0}
+    sorters: List[LineSorter] = []
+    try:
+        if unsorted:
+            excluded = None
+            if subtract:
+                excluded = BoundedSet(memory_limit)
+                for path in subtract:
+                    for block in read_blocks(path):
+                        excluded.add_many(block)
+            seen = BoundedSet(memory_limit)
+            lines = unique_unsorted(paths, seen, excluded, stats)
+        else:
+            lines = sorted_unique(paths, presorted, memory_limit, tmp_dir, stats, sorters)
+            if subtract:
+                excluded = sorted_unique(subtract, subtract_presorted, memory_limit, tmp_dir,
+                                         sorters=sorters)
+                lines = subtract_sorted(lines, excluded)
+
+        stats['written'] = write_lines(output, lines)
+        output.flush()
+        return stats
+    finally:
+        for sorter in sorters:
+            sorter.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Merge candidate lists from any of the generators, removing duplicates")
+    parser.add_argument("inputs", nargs="+",
+                        help="Candidate files, plain or gzip/xz/zstd compressed; '-' for stdin")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    parser.add_argument("-x", "--subtract", action="append", metavar="FILE",
+                        help="Drop every line found in FILE, e.g. candidates already tried; repeatable")
+    parser.add_argument("--presorted", action="store_true",
+                        help="Inputs are already sorted (e.g. mixer.py or merge.py output); merge without sorting")
+    parser.add_argument("--subtract-presorted", action="store_true",
+                        help="Subtract files are sorted, e.g. an index written by an earlier merge")
+    parser.add_argument("--unsorted", action="store_true",
+                        help="Keep input order (e.g. ranked output); dedupe with a fingerprint "
+                             "table while it fits in --memory-mb, beyond that a Bloom filter, "
+                             "which is lossy: it may drop a few unique lines")
+    parser.add_argument("--memory-mb", type=int, default=512,
+                        help="Memory budget in MB for sorted runs or each --unsorted filter "
+                             "(default: 512)")
+    parser.add_argument("--tmp-dir", help="Directory for spill files (default: system temp)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Disable the summary")
+    add_output_arguments(parser)
+    args = parser.parse_args()
+
+    if (args.inputs + (args.subtract or [])).count('-') > 1:
+        parser.error("stdin can only be read once")
+    try:
+        output_format = output_format_from_args(args, args.output)
+    except ValueError as e:
+        parser.error(str(e))
+    log = sys.stdout if args.output else sys.stderr
+    if not output_format.is_plain:
+        output = ChunkedOutput(args.output, output_format)
+    else:
+        output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        stats = merge_candidates(args.inputs, output, args.subtract, args.presorted,
+                                 args.subtract_presorted, args.unsorted,
+                                 args.memory_mb * 1024 * 1024, args.tmp_dir)
+    except BrokenPipeError:
+        handle_broken_pipe()
+        sys.exit(1)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if args.output or not output_format.is_plain:
+            output.close()
+
+    if not args.quiet:
+        print(f"Read {stats['read']:,} lines from {len(args.inputs)} inputs, "
+              f"wrote {stats['written']:,}", file=log)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,58 @@
 import argparse
+import os
+import shutil
 import sys
 import random
-from typing import List
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
 from rich.progress import Progress
 from rich.console import Console
-from itertools import combinations
+from itertools import combinations, islice
+from checkpoint import Checkpoint, add_checkpoint_arguments, checkpoint_from_args, input_identity
+from estimate import Estimate, format_report
+from dedupe import BoundedSet
+from extsort import ExternalSorter
+from leet import LeetEngine
+from memo import LRUCache
+from output import (LineWriter, OutputFormat, add_output_arguments, handle_broken_pipe,
+                    output_format_from_args, written_lines)
+from partition import Partition, add_partition_arguments, partition_from_args
+from policy import Policy, add_policy_arguments, classes_of, policy_from_args
+from rank import RankedSpill, add_rank_arguments, ranker_from_args
+from stats import RunStats, add_stats_arguments, stats_from_args
+from wordfile import WordFile
+
+# Lines per batch handed on from the final merge or ranked drain
+MERGE_BATCH = 65536
+# Stages that depend on the word alone, memoized per word
+MEMOIZED_STAGES = ("Complex patterns", "Leet speak")
+
+class StatsProgress(Progress):
+    """Progress display with the live stage statistics table below the bars."""
+
+    def __init__(self, stats: RunStats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def get_renderables(self):
+        yield from super().get_renderables()
+        yield self.stats.table()
 
 class WordlistManipulator:
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None, leet_max: int = 256, quiet: bool = False,
+                 policy: Optional[Policy] = None, stats: Optional[RunStats] = None,
+                 cache_bytes: int = 64 * 1024 * 1024):
         self.console = Console()
+        self.quiet = quiet
+        self.seed = seed
+        self.leet_max = leet_max
+        self.policy = policy
+        self.stats = stats
+        self.cache_bytes = cache_bytes
+        self.rng = random.Random(seed)
         # Previous prefixes and suffixes lists remain (from last script)
         # Adding new transformation patterns
         self.prefixes = [
@@ -131,6 +175,11 @@ class WordlistManipulator:
             't': ['7', '+', 'T'],
             'z': ['2', 'Z',]
         }
+        self.leet = LeetEngine(self.leet_map, leet_max)
+        # Classes and extra length each leet-able character can bring in
+        self.leet_reach = {char: (classes_of(''.join(replacements)),
+                                  max(len(r) for r in replacements) - 1)
+                           for char, replacements in self.leet_map.items()}
 
         self.number_patterns = [
             "0123", "1234", "2345", "3456", "4567", "5678", "6789",
@@ -205,6 +254,26 @@ class WordlistManipulator:
             "zxcvasdfqwer", "poiulkjhmnbv"
         ]
 
+        # Stages of manipulate_word in the order they draw from the RNG
+        self.stages = [
+            ("Base word", lambda word: [word]),
+            ("Complex patterns", self.generate_complex_patterns),
+            ("Leet speak", self.apply_leet_speak),
+            ("Random transformations", self.apply_random_transformations),
+            ("Prefix/suffix", self.apply_affixes),
+            ("Keyboard patterns", self.apply_keyboard_patterns),
+        ]
+        # Repeated words (duplicates across merged lists) skip the deterministic
+        # stages; the random ones still run and draw from the RNG every time
+        self.cache = LRUCache(cache_bytes) if cache_bytes > 0 else None
+        if self.cache is not None:
+            self.stages = [(name, self.cache.memoize(name, stage)
+                            if name in MEMOIZED_STAGES else stage)
+                           for name, stage in self.stages]
+        if stats is not None:
+            for name, _ in self.stages:
+                stats.stage(name)
+
     def generate_complex_patterns(self, word: str) -> List[str]:
         """Generate complex patterns from the word."""
         patterns = set()
@@ -231,24 +300,11 @@ class WordlistManipulator:
             patterns.add(word + word[:i])
             patterns.add(word[:i] + word)
         
-        return list(patterns)
+        return sorted(patterns)
 
-    def apply_leet_speak(self, word: str) -> List[str]:
-        """Apply leet speak transformations."""
-        leet_words = set()
-        leet_words.add(word)
-        
-        # Generate combinations of leet replacements
-        for char in word.lower():
-            if char in self.leet_map:
-                new_words = set()
-                replacements = self.leet_map[char]
-                for current_word in leet_words:
-                    for replacement in replacements:
-                        new_words.add(current_word.replace(char, replacement))
-                leet_words.update(new_words)
-        
-        return list(leet_words)
+    def apply_leet_speak(self, word: str) -> Iterator[str]:
+        """Lazily apply per-position leet speak, capped at leet_max variants."""
+        return self.leet.variants(word)
 
     def apply_random_transformations(self, word: str) -> List[str]:
         """Apply random transformations to the word."""
@@ -262,107 +318,628 @@ class WordlistManipulator:
         
         # Random number appendages
         for _ in range(3):
-            transformed.add(f"{word}{random.randint(0, 999):03d}")
-            transformed.add(f"{random.randint(0, 999):03d}{word}")
+            transformed.add(f"{word}{self.rng.randint(0, 999):03d}")
+            transformed.add(f"{self.rng.randint(0, 999):03d}{word}")
         
         # Random special character insertions
         special_chars = "!@#$%^&*"
         for _ in range(2):
-            char = random.choice(special_chars)
-            pos = random.randint(0, len(word))
+            char = self.rng.choice(special_chars)
+            pos = self.rng.randint(0, len(word))
             transformed.add(word[:pos] + char + word[pos:])
         
         # Random pattern combinations
-        if random.random() < 0.3:  # 30% chance
-            pattern = random.choice(self.number_patterns)
+        if self.rng.random() < 0.3:  # 30% chance
+            pattern = self.rng.choice(self.number_patterns)
             transformed.add(f"{word}{pattern}")
         
-        if random.random() < 0.3:  # 30% chance
-            sequence = random.choice(self.special_sequences)
+        if self.rng.random() < 0.3:  # 30% chance
+            sequence = self.rng.choice(self.special_sequences)
             transformed.add(f"{sequence}{word}")
         
-        return list(transformed)
+        return sorted(transformed)
 
-    def manipulate_word(self, word: str) -> List[str]:
-        """Generate variations of a word using various transformations."""
-        variations = set()
-        
-        # Base word
-        variations.add(word)
-        
-        # Apply complex patterns
-        variations.update(self.generate_complex_patterns(word))
-        
-        # Apply leet speak transformations
-        variations.update(self.apply_leet_speak(word))
-        
-        # Apply random transformations
-        variations.update(self.apply_random_transformations(word))
-        
-        # Random prefix/suffix application
-        if random.random() < 0.4:  # 40% chance for prefix
-            prefix = random.choice(self.prefixes)
-            variations.add(f"{prefix}{word}")
+    def apply_affixes(self, word: str) -> List[str]:
+        """Randomly add a prefix, a suffix or both."""
+        variations = []
+        if self.rng.random() < 0.4:  # 40% chance for prefix
+            prefix = self.rng.choice(self.prefixes)
+            variations.append(f"{prefix}{word}")
         
-        if random.random() < 0.4:  # 40% chance for suffix
-            suffix = random.choice(self.suffixes)
-            variations.add(f"{word}{suffix}")
+        if self.rng.random() < 0.4:  # 40% chance for suffix
+            suffix = self.rng.choice(self.suffixes)
+            variations.append(f"{word}{suffix}")
         
         # Special combinations (less frequent)
-        if random.random() < 0.2:  # 20% chance for both
-            prefix = random.choice(self.prefixes)
-            suffix = random.choice(self.suffixes)
-            variations.add(f"{prefix}{word}{suffix}")
-        
-        # Add some keyboard patterns
-        if random.random() < 0.3:  # 30% chance
-            pattern = random.choice(self.keyboard_patterns)
-            variations.add(f"{word}{pattern}")
-            variations.add(f"{pattern}{word}")
+        if self.rng.random() < 0.2:  # 20% chance for both
+            prefix = self.rng.choice(self.prefixes)
+            suffix = self.rng.choice(self.suffixes)
+            variations.append(f"{prefix}{word}{suffix}")
+        return variations
+
+    def apply_keyboard_patterns(self, word: str) -> List[str]:
+        """Randomly join a keyboard pattern to either end of the word."""
+        if self.rng.random() < 0.3:  # 30% chance
+            pattern = self.rng.choice(self.keyboard_patterns)
+            return [f"{word}{pattern}", f"{pattern}{word}"]
+        return []
+
+    def stages_for(self, word: str) -> list:
+        """The stages worth running for word under the policy.
+
+        Base word, complex patterns and leet speak only rearrange, re-case or
+        leet the word's own characters, so they are skipped when the classes
+        and lengths they can reach cannot meet the policy. The random stages
+        always run, so the RNG draws and the surviving output stay the same.
+        """
+        policy = self.policy
+        if policy is None or policy.is_length_only and policy.min_length == 0:
+            return self.stages
+        n = len(word)
+        classes = classes_of(word)
+        recased = classes | {'lower', 'upper'} if classes & {'lower', 'upper'} else classes
+        leet_classes, leet_extra = classes, 0
+        for char in word.lower():
+            reach = self.leet_reach.get(char)
+            if reach is not None:
+                leet_classes = leet_classes | reach[0]
+                leet_extra += reach[1]
+        reachable = {"Base word": (classes, n, n),
+                     "Complex patterns": (recased, n, 2 * n),
+                     "Leet speak": (leet_classes, n, n + leet_extra)}
+        stages = []
+        for name, stage in self.stages:
+            reach = reachable.get(name)
+            if reach is None or policy.possible(reach[0]) and policy.fits(reach[1], reach[2]):
+                stages.append((name, stage))
+        return stages
+
+    def manipulate_word(self, word: str) -> List[str]:
+        """Generate variations of a word using various transformations."""
+        variations = []
+        for _, stage in self.stages_for(word):
+            variations.extend(stage(word))
         
-        return list(variations)
+        # Insertion order, unlike set order, is the same in every process
+        return list(dict.fromkeys(variations))
+
+    def manipulate_word_counted(self, word: str, stats: RunStats) -> List[str]:
+        """manipulate_word plus the policy filter, counting and timing every
+        stage in stats. A candidate counts as a duplicate when an earlier
+        stage already produced it for this word."""
+        policy = self.policy
+        clock = time.perf_counter
+        seen = set()
+        variations = []
+        for name, stage in self.stages_for(word):
+            counters = stats.stage(name)
+            started = clock()
+            candidates = list(stage(word))
+            counters.seconds += clock() - started
+            fresh = []
+            for candidate in candidates:
+                if candidate not in seen:
+                    seen.add(candidate)
+                    fresh.append(candidate)
+            counters.generated += len(candidates)
+            counters.duplicates += len(candidates) - len(fresh)
+            if policy is not None:
+                fresh = counters.filter(policy, fresh)
+            counters.unique += len(fresh)
+            variations.extend(fresh)
+        return variations
+
+    def worker_options(self) -> dict:
+        """Constructor arguments needed to rebuild this manipulator in a worker."""
+        return {'leet_max': self.leet_max, 'policy': self.policy, 'stats': self.stats,
+                'cache_bytes': self.cache_bytes}
+
+    def manipulate_chunk(self, words: Iterable[Tuple[int, str]],
+                         seed: Optional[int] = None) -> Tuple[int, List[str]]:
+        """Generate variations for (line number, word) pairs, returning
+        (word_count, variations).
+
+        Given a seed, the RNG is reseeded from (seed, line number) before each word.
+        With a policy, words longer than its maximum length are skipped outright
+        (no variation is shorter than its word), stages that cannot meet it are
+        skipped (see stages_for) and the rest are filtered here, so rejected
+        candidates never leave the worker. With stats, every stage
+        is counted and timed (see manipulate_word_counted), cache lookups included.
+        """
+        policy = self.policy
+        stats = self.stats
+        max_length = policy.max_length if policy is not None else None
+        count = 0
+        variations = []
+        for line, word in words:
+            count += 1
+            if max_length is not None and len(word) > max_length:
+                continue
+            if seed is not None:
+                self.rng.seed(_word_seed(seed, line))
+            if stats is not None:
+                variations.extend(self.manipulate_word_counted(word, stats))
+            elif policy is None:
+                variations.extend(self.manipulate_word(word))
+            else:
+                variations.extend(policy.filter(self.manipulate_word(word)))
+        if stats is not None and self.cache is not None:
+            for name, (hits, misses, evictions) in self.cache.drain().items():
+                counters = stats.stage(name)
+                counters.cache_hits += hits
+                counters.cache_misses += misses
+                counters.cache_evictions += evictions
+        return count, variations
+
+    def generate_variations(self, words: Union[WordFile, Iterable[str]], start_line: int = 0,
+                            stop_line: Optional[int] = None, workers: int = 1,
+                            chunk_bytes: int = 1 << 14,
+                            chunk_size: int = 1000) -> Iterator[Tuple[int, int, List[str]]]:
+        """Yield (word_count, byte_count, variations) for each chunk of the input
+        lines [start_line, stop_line), in input order.
+
+        words is either a mapped WordFile, cut into byte spans at line
+        boundaries that pool workers map and read themselves, or any iterable
+        of words, sent to workers in lists of chunk_size (byte_count is then 0).
+        With a seed, line i always uses an RNG seeded from (seed, i), so the
+        output is the same whether it runs serially, across a process pool or
+        as a partition. Stage counters from pool workers are merged into stats.
+        """
+        seed = self.seed
+        if seed is None and workers > 1:
+            seed = random.randrange(2 ** 32)
+
+        if isinstance(words, WordFile):
+            wordfile = words
+            start = wordfile.line_offset(start_line)
+            end = wordfile.size if stop_line is None else wordfile.line_offset(stop_line)
+            jobs = (((wordfile.path, first, lo, hi), hi - lo)
+                    for first, lo, hi in wordfile.chunks(start, end, start_line, chunk_bytes))
+
+            def local_words(job):
+                _, first, lo, hi = job
+                return wordfile.words(lo, hi, first)
+        else:
+            jobs = (((chunk,), 0) for chunk in _chunked(islice(words, start_line, stop_line),
+                                                         chunk_size, start_line))
 
-    def process_wordlist(self, input_file: str, output_file: str):
-        """Process the input wordlist and write variations to output file."""
+            def local_words(job):
+                return job[0]
+
+        if workers <= 1:
+            for job, nbytes in jobs:
+                count, variations = self.manipulate_chunk(local_words(job), seed)
+                yield count, nbytes, variations
+            return
+
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(self.worker_options(),)) as executor:
+            # Keep a bounded number of chunks in flight so memory stays flat
+            pending = deque()
+            for job, nbytes in jobs:
+                pending.append((nbytes, executor.submit(_process_job, job, seed)))
+                if len(pending) >= workers * 2:
+                    nbytes, future = pending.popleft()
+                    yield self._job_result(future, nbytes)
+            while pending:
+                nbytes, future = pending.popleft()
+                yield self._job_result(future, nbytes)
+
+    def _job_result(self, future, nbytes: int) -> Tuple[int, int, List[str]]:
+        count, variations, stages = future.result()
+        if stages is not None:
+            self.stats.merge(stages)
+        return count, nbytes, variations
+
+    def read_words(self, input_file: str) -> Iterator[str]:
+        """Lazily yield stripped, non-empty words from the input file."""
+        with WordFile(input_file) as wordfile:
+            for _, word in wordfile.words():
+                yield word
+
+    def iter_candidates(self, words: Union[str, Iterable[str]], workers: int = 1,
+                        partition: Optional[Partition] = None, sort: bool = True,
+                        dedupe: bool = True, memory_limit: int = 512 * 1024 * 1024,
+                        tmp_dir: Optional[str] = None, ranker: Optional[RankedSpill] = None,
+                        on_chunk: Optional[Callable[[int, int], None]] = None) -> Iterator[str]:
+        """Lazily yield the variations of words, a wordlist path or any iterable
+        of words (e.g. another generator's candidates).
+
+        Memory stays within roughly memory_limit bytes however large the output.
+        Sorted output is an external merge sort: variations are buffered and
+        spilled to disk as sorted runs, which are k-way merged with duplicates
+        dropped during the merge, so nothing is yielded until the input is
+        exhausted. Unsorted output streams as it is produced, deduplicated by a
+        BoundedSet: a fingerprint table until it would outgrow memory_limit,
+        then a Bloom filter of memory_limit bytes (a false positive drops a
+        candidate, a duplicate is never let through). With a seed its hashes
+        are salted from the seed, so even the Bloom filter drops the same
+        candidates on every run.
+        Without dedupe every word's variations are yielded as they come. With
+        a ranker the (deduplicated) variations are binned by model cost and
+        yielded most likely first.
+
+        A wordlist path is memory-mapped and split on raw bytes, so words that
+        are not valid UTF-8 come through byte-exact. The partition counts input
+        lines; lines before its start are skipped by offset, not manipulated.
+        on_chunk(word_count, byte_count) is called after each chunk of input.
+        """
+        for batch, _ in self.candidate_batches(words, workers, partition, sort, dedupe,
+                                               memory_limit, tmp_dir, ranker, on_chunk):
+            yield from batch
+
+    def candidate_batches(self, words: Union[str, Iterable[str]], workers: int = 1,
+                          partition: Optional[Partition] = None, sort: bool = True,
+                          dedupe: bool = True, memory_limit: int = 512 * 1024 * 1024,
+                          tmp_dir: Optional[str] = None, ranker: Optional[RankedSpill] = None,
+                          on_chunk: Optional[Callable[[int, int], None]] = None,
+                          keep_runs: bool = False, resume: Optional[dict] = None,
+                          written: Iterable[List[str]] = ()
+                          ) -> Iterator[Tuple[List[str], Optional[dict]]]:
+        """The output of iter_candidates in batches, each paired with the state
+        to resume from once everything up to that batch has been written.
+
+        The state is None where no resume point exists: for input that is not
+        a wordlist path, for ranked output, and for sorted output while
+        variations are still buffered in memory. Otherwise it holds the input
+        'offset' reached and, for sorted output, the 'runs' spilled so far,
+        which only stay valid with keep_runs (spill files then outlive merges
+        and errors; the caller removes tmp_dir). Passing such a state as resume
+        continues from it, with written holding the blocks of candidates
+        already written to refill the dedupe filter.
+        """
+        partition = partition or Partition()
+        if ranker is not None:
+            sort = False
+        sorter = ExternalSorter(memory_limit, tmp_dir) if sort and dedupe else None
+        if sorter is not None:
+            sorter.keep_merged = keep_runs
+            if resume is not None:
+                sorter.runs = list(resume['runs'])
         try:
-            # Read input file
-            with open(input_file, 'r', encoding='utf-8', errors='ignore') as f:
-                words = [line.strip() for line in f if line.strip()]
+            with (WordFile(words, tmp_dir) if isinstance(words, str)
+                  else nullcontext(words)) as source:
+                if isinstance(source, WordFile):
+                    total = source.count_lines() if partition.needs_total else None
+                else:
+                    total = len(source) if hasattr(source, '__len__') else None
+                start, stop = partition.range(total)
+                resumable = isinstance(source, WordFile) and ranker is None
+                if resumable:
+                    offset = source.line_offset(start)
+                    if resume is not None:
+                        offset = resume['offset']
+                        start = source.line_at(offset)
+
+                seen = None
+                if dedupe and not sort:
+                    # Unseeded output differs per run anyway, so keep the faster hash()
+                    seen = BoundedSet(memory_limit, salt=None if self.seed is None
+                                      else _dedupe_salt(self.seed))
+                    for block in written:
+                        seen.add_many(block)
+
+                for count, nbytes, variations in self.generate_variations(
+                        source, start, stop, workers):
+                    if on_chunk is not None:
+                        on_chunk(count, nbytes)
+                    if resumable:
+                        offset += nbytes
+                    if seen is not None:
+                        variations = seen.add_many(variations)
+                    if sorter is not None:
+                        runs = len(sorter.runs)
+                        sorter.add(variations)
+                        if resumable and len(sorter.runs) > runs:
+                            yield [], {'offset': offset, 'runs': list(sorter.runs)}
+                    elif ranker is not None:
+                        ranker.write_lines(variations)
+                    else:
+                        yield variations, {'offset': offset} if resumable else None
+
+            if sorter is not None:
+                if not self.quiet and sorter.runs:
+                    self.console.print("[cyan]Merging sorted runs...[/cyan]")
+                for batch in _batched(sorter.merge(), MERGE_BATCH):
+                    yield batch, None
+            if ranker is not None:
+                if not self.quiet:
+                    self.console.print("[cyan]Writing ranked candidates...[/cyan]")
+                for batch in _batched(ranker.drain(), MERGE_BATCH):
+                    yield batch, None
+        finally:
+            if sorter is not None and not keep_runs:
+                sorter.cleanup()
+            if ranker is not None:
+                ranker.cleanup()
 
-            total_words = len(words)
-            all_variations = set()
+    def _open_output(self, output_file: Optional[str], resume: Optional[dict] = None,
+                     output_format: Optional[OutputFormat] = None) -> LineWriter:
+        """Open the output sink; with stdout output, console messages move to stderr."""
+        if resume is None:
+            writer = LineWriter(output_file, output_format=output_format)
+        else:
+            writer = LineWriter(output_file, resume=resume['output'],
+                                resume_count=resume['written'], output_format=output_format)
+        if writer.is_stdout:
+            self.console = Console(stderr=True)
+        return writer
+
+    def _print_summary(self, total_words: int, written: int, writer: LineWriter):
+        if self.quiet:
+            return
+        self.console.print(f"\n[green]Success![/green]")
+        self.console.print(f"Original words: {total_words}")
+        self.console.print(f"Generated variations: {written}")
+        if not writer.is_stdout:
+            self.console.print(f"Output saved to: {writer.destination}")
+
+    def process_wordlist(self, input_file: str, output_file: Optional[str], workers: int = 1,
+                         partition: Optional[Partition] = None, sort: bool = True,
+                         dedupe: bool = True, memory_limit: int = 512 * 1024 * 1024,
+                         tmp_dir: Optional[str] = None, ranker: Optional[RankedSpill] = None,
+                         checkpoint: Optional[Checkpoint] = None,
+                         output_format: Optional[OutputFormat] = None):
+        """Write the variations of the input wordlist to output_file (None for stdout).
+
+        See iter_candidates for the ordering, dedupe and partition options.
+        output_format compresses or chunks the output; a compressed input is
+        decompressed into tmp_dir first (see WordFile).
+        With a checkpoint, the input offset, output size and sorted runs are
+        saved as the job goes (runs live in <checkpoint>.runs until it ends),
+        and a resumed job continues from them. Without a seed one is drawn
+        and saved, so the resumed output is identical to an uninterrupted run.
+        """
+        partition = partition or Partition()
+        output_format = output_format or OutputFormat()
+        total_words = 0
+        try:
+            job = state = None
+            if checkpoint is not None:
+                if ranker is not None:
+                    raise ValueError("ranked output cannot be checkpointed")
+                job = {'tool': 'mixer', **input_identity(input_file),
+                       'output': os.path.abspath(output_file), 'seed': self.seed,
+                       'leet_max': self.leet_max, 'policy': str(self.policy),
+                       'partition': str(partition), 'sort': sort, 'dedupe': dedupe,
+                       'output_format': str(output_format)}
+                state = checkpoint.load(job)
+                if self.seed is None:
+                    self.seed = random.randrange(2 ** 32) if state is None else state['seed']
+                tmp_dir = f"{checkpoint.path}.runs"
+                _prepare_run_dir(tmp_dir, state['runs'] if state and 'runs' in state else None)
+                if state is not None:
+                    total_words = state['words']
 
-            # Process each word with progress bar
-            with Progress() as progress:
-                task = progress.add_task("[cyan]Processing wordlist...", total=total_words)
+            with WordFile(input_file, tmp_dir) as wordfile, \
+                    self._open_output(output_file, state, output_format) as writer:
+                if self.stats is None:
+                    display = Progress(console=self.console, disable=self.quiet)
+                else:
+                    display = StatsProgress(self.stats, console=self.console,
+                                            disable=self.quiet)
+                with display as progress:
+                    task = progress.add_task("[cyan]Processing wordlist...",
+                                             total=wordfile.size,
+                                             completed=state['offset'] if state else 0)
 
-                for word in words:
-                    variations = self.manipulate_word(word)
-                    all_variations.update(variations)
-                    progress.advance(task)
+                    def on_chunk(count, nbytes):
+                        nonlocal total_words
+                        total_words += count
+                        progress.advance(task, nbytes)
+                        if self.stats is not None:
+                            self.stats.sample(writer.count)
 
-            # Write output file
-            with open(output_file, 'w', encoding='utf-8') as f:
-                for variation in sorted(all_variations):
-                    f.write(f"{variation}\n")
+                    written = (written_lines(output_file, state['output'], output_format)
+                               if state is not None and dedupe and not sort else ())
+                    for batch, position in self.candidate_batches(
+                            wordfile, workers, partition, sort, dedupe, memory_limit, tmp_dir,
+                            ranker, on_chunk, keep_runs=checkpoint is not None, resume=state,
+                            written=written):
+                        writer.write_lines(batch)
+                        if self.stats is not None:
+                            self.stats.sample(writer.count)
+                        if checkpoint is not None and position is not None and checkpoint.due():
+                            checkpoint.save(job, {**position, 'seed': self.seed,
+                                                  'words': total_words,
+                                                  'output': writer.position(),
+                                                  'written': writer.count})
 
-            self.console.print(f"\n[green]Success![/green]")
-            self.console.print(f"Original words: {total_words}")
-            self.console.print(f"Generated variations: {len(all_variations)}")
-            self.console.print(f"Output saved to: {output_file}")
+                    if self.stats is not None:
+                        self.stats.finish(writer.count)
 
+            if checkpoint is not None:
+                checkpoint.clear()
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            self._print_summary(total_words, writer.count, writer)
+
+        except BrokenPipeError:
+            handle_broken_pipe()
+            sys.exit(1)
+        except KeyboardInterrupt:
+            if checkpoint is not None:
+                self.console.print(f"[yellow]Interrupted; continue with --resume "
+                                   f"(checkpoint: {checkpoint.path})[/yellow]")
+            sys.exit(130)
         except Exception as e:
             self.console.print(f"[red]Error: {str(e)}[/red]")
             sys.exit(1)
 
+    def estimate(self, input_file: str, sample_size: int = 1000) -> str:
+        """Estimate output size without running the full generation.
+
+        Per-stage candidate counts are computed from the pattern tables for every
+        input word. The deduplication ratio and average length come from running
+        manipulate_word on the first sample_size words only.
+        """
+        # Expected number of candidates from the random stages of manipulate_word
+        random_stage = 4 + 3 * 2 + 2 + 0.3 + 0.3
+        affix_stage = 0.4 + 0.4 + 0.2
+        keyboard_stage = 0.3 * 2
+
+        stages = {"Base word": 0, "Complex patterns": 0, "Leet speak": 0,
+                  "Random transformations": 0, "Prefix/suffix": 0, "Keyboard patterns": 0}
+        total_words = 0
+        sample_generated = 0
+        sample_unique = set()
+        for word in self.read_words(input_file):
+            counts = (1, 9 + 2 * max(0, min(5, len(word)) - 1), self.leet.count(word),
+                      random_stage, affix_stage, keyboard_stage)
+            for name, count in zip(stages, counts):
+                stages[name] += count
+            if total_words < sample_size:
+                sample_generated += sum(counts)
+                sample_unique.update(self.manipulate_word(word))
+            total_words += 1
+
+        generated = sum(stages.values())
+        ratio = len(sample_unique) / sample_generated if sample_generated else 0
+        avg_length = (sum(len(v) for v in sample_unique) / len(sample_unique)
+                      if sample_unique else 0)
+        estimates = [Estimate(name, count) for name, count in stages.items()]
+        total = Estimate("Total", generated, generated * ratio, avg_length)
+        return format_report(f"Estimate for {input_file} ({total_words:,} words, "
+                             f"dedupe sampled from {min(total_words, sample_size):,})",
+                             estimates, total)
+
+def _batched(lines: Iterable[str], size: int) -> Iterator[List[str]]:
+    iterator = iter(lines)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def _prepare_run_dir(path: str, runs: Optional[List[str]]):
+    """Create a checkpointed job's run directory, removing runs a crashed run
+    spilled after its last checkpoint."""
+    # Spill files are recorded by absolute path (see tempfile.mkstemp)
+    path = os.path.abspath(path)
+    os.makedirs(path, exist_ok=True)
+    keep = set(runs or [])
+    missing = keep - {os.path.join(path, name) for name in os.listdir(path)}
+    if missing:
+        raise ValueError(f"checkpointed run files are missing: {', '.join(sorted(missing))}")
+    for name in os.listdir(path):
+        if os.path.join(path, name) not in keep:
+            os.remove(os.path.join(path, name))
+
+def _chunked(words: Iterable[str], size: int,
+             start: int = 0) -> Iterator[List[Tuple[int, str]]]:
+    """Split an iterable of words into lists of at most size (index, word) pairs."""
+    chunk = []
+    for pair in enumerate(words, start):
+        chunk.append(pair)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _word_seed(seed: int, line: int) -> str:
+    """Derive the RNG seed for the word on one input line from the run seed."""
+    return f"{seed}:{line}"
+
+def _dedupe_salt(seed: int) -> int:
+    """Derive the dedupe hash salt from the run seed, so a seeded run (and a
+    resumed one, whose seed is checkpointed) dedupes the same way every time."""
+    return random.Random(f"{seed}:dedupe").getrandbits(64)
+
+# Per-process manipulator used by pool workers
+_worker = None
+
+def _init_worker(options: dict):
+    global _worker
+    _worker = WordlistManipulator(**options)
+
+_wordfiles = {}
+
+def _process_job(job: tuple, seed: int) -> Tuple[int, List[str], Optional[dict]]:
+    """Manipulate a (path, first_line, start, end) file span or a ([(line, word)],) chunk,
+    returning the word count, variations and the stage counters of the job (if counted)."""
+    if len(job) == 4:
+        path, first_line, start, end = job
+        if path not in _wordfiles:
+            _wordfiles[path] = WordFile(path)
+        words = _wordfiles[path].words(start, end, first_line)
+    else:
+        words = job[0]
+    count, variations = _worker.manipulate_chunk(words, seed)
+    stages = _worker.stats.drain() if _worker.stats is not None else None
+    return count, variations, stages
+
 def main():
     parser = argparse.ArgumentParser(description="Advanced Wordlist Manipulator")
-    parser.add_argument("-i", "--input", required=True, help="Input wordlist file")
-    parser.add_argument("-o", "--output", required=True, help="Output file for modified wordlist")
+    parser.add_argument("-i", "--input", required=True,
+                        help="Input wordlist file, plain or gzip/xz/zstd compressed")
+    parser.add_argument("-o", "--output", help="Output file for modified wordlist")
+    parser.add_argument("--stdout", action="store_true",
+                        help="Write candidates to stdout for piping; progress goes to stderr")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Disable progress output")
+    parser.add_argument("--estimate", "--dry-run", action="store_true",
+                        help="Print expected candidate counts and output size, then exit")
+    parser.add_argument("--unsorted", action="store_true",
+                        help="Write variations as produced instead of sorted; dedupe uses a fingerprint "
+                             "table until it outgrows --memory-mb, then a Bloom filter, which "
+                             "may drop a few unique candidates")
+    parser.add_argument("--no-dedupe", action="store_true",
+                        help="Write variations as produced without global dedupe")
+    # Streaming with bounded memory is the only mode now; kept for old scripts
+    parser.add_argument("--stream", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--memory-mb", type=int, default=512,
+                        help="Memory budget in MB for sorted runs or the dedupe table (default: 512)")
+    parser.add_argument("--tmp-dir", help="Directory for spill files (default: system temp)")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Number of worker processes (default: 1)")
+    parser.add_argument("--seed", type=int, help="Seed for reproducible random transformations")
+    parser.add_argument("--leet-max", type=int, default=256,
+                        help="Maximum leet variants per word, 0 for no limit (default: 256)")
+    parser.add_argument("--cache-mb", type=int, default=64,
+                        help="Memory budget in MB per worker for caching complex patterns and "
+                             "leet speak of repeated words, 0 to disable (default: 64)")
+    add_partition_arguments(parser, unit="input lines")
+    add_policy_arguments(parser)
+    add_rank_arguments(parser)
+    add_checkpoint_arguments(parser)
+    add_stats_arguments(parser)
+    add_output_arguments(parser)
     args = parser.parse_args()
+    try:
+        partition = partition_from_args(args)
+        policy = policy_from_args(args)
+        checkpoint = checkpoint_from_args(args, None if args.stdout else args.output)
+        output_format = output_format_from_args(args, None if args.stdout else args.output)
+    except ValueError as e:
+        parser.error(str(e))
+    if checkpoint is not None and args.rank:
+        parser.error("--rank output cannot be checkpointed")
+    if policy.is_length_only and policy.min_length == 0 and policy.max_length is None:
+        policy = None
 
-    manipulator = WordlistManipulator()
-    manipulator.process_wordlist(args.input, args.output)
+    stats = stats_from_args(args)
+    manipulator = WordlistManipulator(seed=args.seed, leet_max=args.leet_max, quiet=args.quiet,
+                                      policy=policy, stats=stats,
+                                      cache_bytes=args.cache_mb * 1024 * 1024)
+    if args.estimate:
+        print(manipulator.estimate(args.input))
+        return
+    if args.stdout:
+        args.output = None
+    elif not args.output:
+        parser.error("one of -o/--output or --stdout is required")
+    ranker = ranker_from_args(args, args.memory_mb * 1024 * 1024, args.tmp_dir)
+    try:
+        manipulator.process_wordlist(args.input, args.output, workers=args.workers,
+                                     partition=partition, sort=not args.unsorted,
+                                     dedupe=not args.no_dedupe,
+                                     memory_limit=args.memory_mb * 1024 * 1024,
+                                     tmp_dir=args.tmp_dir, ranker=ranker, checkpoint=checkpoint,
+                                     output_format=output_format)
+    finally:
+        # Interrupted and failed runs still report what they got through
+        if stats is not None:
+            stats.save(args.stats, tool='mixer', input=args.input, workers=args.workers,
+                       seed=manipulator.seed)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,485 @@
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+from itertools import islice
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional
+
+from compress import CODECS, check_codec, codec_for_path, compressor, open_reader
+
+
+class LineWriter:
+    """Buffered binary line sink writing to a file, or to stdout when path is None or '-'.
+
+    Lines are joined and encoded in large batches so that each write call moves
+    megabytes at a time, which keeps throughput high when piping into a cracker.
+    An output_format that compresses or chunks the output hands the encoded
+    batches to a ChunkedOutput, which does that work on a background thread.
+    With resume (a position() saved in a checkpoint), the existing output is
+    cut back to that point and appended to; count then starts at resume_count.
+    """
+
+    def __init__(self, path: Optional[str] = None, batch_size: int = 65536,
+                 resume: Optional[dict] = None, resume_count: int = 0,
+                 output_format: Optional['OutputFormat'] = None):
+        self.path = path
+        self.batch_size = batch_size
+        self.batch: List[str] = []
+        self.count = 0 if resume is None else resume_count
+        self.is_stdout = path is None or path == '-'
+        self.format = output_format or OutputFormat()
+        if not self.format.is_plain:
+            self.stream = ChunkedOutput(path, self.format, resume)
+            self.owns_stream = True
+        elif self.is_stdout:
+            self.stream = sys.stdout.buffer
+            self.owns_stream = False
+        elif resume is not None:
+            self.stream = open(path, 'r+b', buffering=1 << 20)
+            self.stream.truncate(resume['output_bytes'])
+            self.stream.seek(resume['output_bytes'])
+            self.owns_stream = True
+        else:
+            self.stream = open(path, 'wb', buffering=1 << 20)
+            self.owns_stream = True
+
+    def _write_block(self, lines: List[str]):
+        data = ("\n".join(lines) + "\n").encode('utf-8', errors='surrogateescape')
+        self.stream.write(data)
+
+    def write(self, line: str):
+        """Queue a single line, writing the batch once it is full."""
+        self.batch.append(line)
+        self.count += 1
+        if len(self.batch) >= self.batch_size:
+            batch, self.batch = self.batch, []
+            self._write_block(batch)
+
+    def write_lines(self, lines: Iterable[str]):
+        """Write many lines, encoding them in batch_size blocks."""
+        if self.batch:
+            batch, self.batch = self.batch, []
+            self._write_block(batch)
+        iterator = iter(lines)
+        while True:
+            block = list(islice(iterator, self.batch_size))
+            if not block:
+                break
+            self._write_block(block)
+            self.count += len(block)
+
+    def flush(self):
+        if self.batch:
+            batch, self.batch = self.batch, []
+            self._write_block(batch)
+        self.stream.flush()
+
+    @property
+    def destination(self) -> str:
+        """Where the output went, for summaries."""
+        if self.is_stdout:
+            return "stdout"
+        if self.format.is_chunked:
+            return f"{len(self.stream.chunks)} chunks listed in {self.stream.manifest_path}"
+        return self.path
+
+    def position(self) -> dict:
+        """Resume point once everything queued is written, for a checkpoint."""
+        self.flush()
+        if isinstance(self.stream, ChunkedOutput):
+            return self.stream.position()
+        return {'output_bytes': self.stream.tell()}
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self.owns_stream:
+                self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is BrokenPipeError:
+            return False
+        self.close()
+        return False
+
+
+class OutputFormat:
+    """How output is laid out on disk: an optional compression codec and
+    chunk limits.
+
+    With chunk_lines or chunk_bytes (uncompressed, cut at line boundaries)
+    the output is split into numbered files, whichever limit is reached
+    first, and listed in a manifest next to them.
+    """
+
+    def __init__(self, compression: Optional[str] = None, level: Optional[int] = None,
+                 chunk_lines: Optional[int] = None, chunk_bytes: Optional[int] = None):
+        if compression is not None:
+            check_codec(compression)
+        if chunk_lines is not None and chunk_lines < 1:
+            raise ValueError("chunk lines must be at least 1")
+        if chunk_bytes is not None and chunk_bytes < 1:
+            raise ValueError("chunk size must be at least 1 byte")
+        self.compression = compression
+        self.level = level
+        self.chunk_lines = chunk_lines
+        self.chunk_bytes = chunk_bytes
+
+    @property
+    def is_chunked(self) -> bool:
+        return self.chunk_lines is not None or self.chunk_bytes is not None
+
+    @property
+    def is_plain(self) -> bool:
+        return self.compression is None and not self.is_chunked
+
+    def chunk_path(self, path: str, index: int) -> str:
+        """File holding chunk index of output path: out.txt.gz -> out.00003.txt.gz."""
+        if not self.is_chunked:
+            return path
+        extension = CODECS[self.compression][0] if self.compression else ''
+        if extension and path.endswith(extension):
+            path = path[:-len(extension)]
+        root, text_extension = os.path.splitext(path)
+        return f"{root}.{index:05d}{text_extension}{extension}"
+
+    def __str__(self) -> str:
+        parts = []
+        if self.compression:
+            level = "" if self.level is None else f" level {self.level}"
+            parts.append(f"{self.compression}{level}")
+        if self.chunk_lines is not None:
+            parts.append(f"chunks of {self.chunk_lines:,} lines")
+        if self.chunk_bytes is not None:
+            parts.append(f"chunks of {self.chunk_bytes:,} bytes")
+        return ", ".join(parts) or "plain"
+
+
+class _Background:
+    """Runs calls in submission order on one thread.
+
+    At most depth calls wait in the queue, so a slow disk or compressor
+    holds the producer back instead of buffering without bound. An error
+    raised on the thread is re-raised by the next submit(), wait() or stop(),
+    and every call after it is skipped.
+    """
+
+    def __init__(self, depth: int = 8):
+        self.queue: queue.Queue = queue.Queue(depth)
+        self.error: Optional[BaseException] = None
+        self.failed = False
+        self.thread = threading.Thread(target=self._run, name="output-writer", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            call = self.queue.get()
+            try:
+                if call is None:
+                    return
+                if not self.failed:
+                    call[0](*call[1:])
+            except BaseException as e:
+                self.error = e
+                self.failed = True
+            finally:
+                self.queue.task_done()
+
+    def _raise(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def submit(self, function: Callable, *args):
+        self._raise()
+        self.queue.put((function,) + args)
+
+    def wait(self):
+        """Block until every submitted call has run."""
+        self.queue.join()
+        self._raise()
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join()
+        self._raise()
+
+
+class _CountingFile:
+    """Write-only wrapper that counts and hashes the bytes of a chunk file."""
+
+    def __init__(self, file: BinaryIO, size: int = 0, digest=None):
+        self.file = file
+        self.size = size
+        self.digest = digest or hashlib.sha256()
+
+    def write(self, data) -> int:
+        self.file.write(data)
+        self.size += len(data)
+        self.digest.update(data)
+        return len(data)
+
+    def flush(self):
+        self.file.flush()
+
+
+class ChunkedOutput:
+    """Binary output stream that compresses and/or splits into chunks what
+    is written to it, one or more whole lines per write().
+
+    Compression, hashing and file writes run on a background thread, so
+    they overlap generation; zlib, lzma and zstd release the GIL while they
+    work. Chunks are cut at line boundaries once either limit of the format
+    is reached. Each finished chunk is added to <path>.manifest.json with its
+    line count, sizes and SHA-256, so it can be shipped while the run goes on.
+
+    position() ends the current compressed stream (a gzip member, xz stream
+    or zstd frame; readers go straight on to the next one) and returns the
+    resume point. Passing it back as resume cuts the current chunk file to
+    that size, drops later chunks and continues with a new stream.
+    """
+
+    def __init__(self, path: Optional[str], output_format: OutputFormat,
+                 resume: Optional[dict] = None):
+        self.path = path
+        self.format = output_format
+        self.is_stdout = path is None or path == '-'
+        if self.is_stdout and output_format.is_chunked:
+            raise ValueError("chunked output needs an output file, not stdout")
+        # The chunk being filled and the running total, kept by the caller's thread
+        self.index = 0
+        self.lines = 0
+        self.bytes = 0
+        self.total_bytes = 0
+        # Open chunk file, compressor and finished chunks, kept by the writer thread
+        self.raw: Optional[_CountingFile] = None
+        self.stream = None
+        self.chunks: List[dict] = []
+        if resume is not None:
+            self._resume(resume)
+        self.worker = _Background()
+
+    @property
+    def manifest_path(self) -> str:
+        return f"{self.path}.manifest.json"
+
+    def _resume(self, state: dict):
+        self.index = state['chunk']
+        self.lines = state['lines']
+        self.bytes = state['bytes']
+        self.total_bytes = state['output_bytes']
+        self.chunks = [dict(chunk) for chunk in state['chunks']]
+        # Chunks a crashed run started after its last checkpoint
+        index = self.index + 1 if state['offset'] else self.index
+        while self.format.is_chunked and os.path.exists(self.format.chunk_path(self.path, index)):
+            os.remove(self.format.chunk_path(self.path, index))
+            index += 1
+        if state['offset']:
+            f = open(self.format.chunk_path(self.path, self.index), 'r+b', buffering=1 << 20)
+            f.truncate(state['offset'])
+            digest = hashlib.sha256()
+            for data in iter(lambda: f.read(1 << 20), b''):
+                digest.update(data)
+            self.raw = _CountingFile(f, state['offset'], digest)
+
+    def _cut(self, data: bytes) -> int:
+        """Length of the leading part of data that fits in the current chunk."""
+        cut = len(data)
+        chunk_lines, chunk_bytes = self.format.chunk_lines, self.format.chunk_bytes
+        if chunk_lines is not None:
+            left = chunk_lines - self.lines
+            if data.count(b'\n') > left:
+                cut = len(data) - len(data.split(b'\n', left)[-1])
+        if chunk_bytes is not None and cut > chunk_bytes - self.bytes:
+            end = data.rfind(b'\n', 0, chunk_bytes - self.bytes) + 1
+            if not end and not self.bytes:
+                # A single line longer than a chunk gets a chunk of its own
+                end = data.find(b'\n') + 1 or len(data)
+            cut = min(cut, end)
+        return cut
+
+    def _full(self) -> bool:
+        chunk_lines, chunk_bytes = self.format.chunk_lines, self.format.chunk_bytes
+        return ((chunk_lines is not None and self.lines >= chunk_lines)
+                or (chunk_bytes is not None and self.bytes >= chunk_bytes))
+
+    def write(self, data: bytes) -> int:
+        size = len(data)
+        if not self.format.is_chunked:
+            self.worker.submit(self._write, self.index, data)
+            self.total_bytes += size
+            return size
+        while data:
+            cut = self._cut(data)
+            if cut:
+                part, data = (data, b'') if cut == len(data) else (data[:cut], data[cut:])
+                self.worker.submit(self._write, self.index, part)
+                self.lines += part.count(b'\n')
+                self.bytes += len(part)
+                self.total_bytes += len(part)
+            if data or self._full():
+                self._next_chunk()
+        return size
+
+    def _next_chunk(self):
+        self.worker.submit(self._finish_chunk, self.index, self.lines, self.bytes)
+        self.index += 1
+        self.lines = self.bytes = 0
+
+    def flush(self):
+        self.worker.submit(self._flush)
+        self.worker.wait()
+
+    def position(self) -> dict:
+        """Resume point once everything written so far is on disk."""
+        self.worker.submit(self._end_stream)
+        self.worker.wait()
+        return {'output_bytes': self.total_bytes, 'chunk': self.index, 'lines': self.lines,
+                'bytes': self.bytes, 'offset': self.raw.size if self.raw is not None else 0,
+                'chunks': [dict(chunk) for chunk in self.chunks]}
+
+    def close(self):
+        try:
+            # Unchunked output always gets its file, even when empty
+            if self.lines or self.bytes or not self.format.is_chunked:
+                self._next_chunk()
+            if self.format.is_chunked:
+                self.worker.submit(self._write_manifest, True)
+        finally:
+            self.worker.stop()
+
+    # The methods below run on the writer thread
+
+    def _write(self, index: int, data: bytes):
+        if self.stream is None:
+            if self.raw is None:
+                f = (sys.stdout.buffer if self.is_stdout
+                     else open(self.format.chunk_path(self.path, index), 'wb', buffering=1 << 20))
+                self.raw = _CountingFile(f)
+            self.stream = (self.raw if self.format.compression is None
+                           else compressor(self.format.compression, self.raw, self.format.level))
+        self.stream.write(data)
+
+    def _end_stream(self):
+        """Finish the current compressed stream; the next write starts another."""
+        if self.stream is not None and self.stream is not self.raw:
+            self.stream.close()
+        self.stream = None
+        self._flush()
+
+    def _flush(self):
+        if self.stream is not None:
+            self.stream.flush()
+        if self.raw is not None:
+            self.raw.flush()
+
+    def _finish_chunk(self, index: int, lines: int, nbytes: int):
+        if self.raw is None:
+            self._write(index, b'')
+        self._end_stream()
+        if not self.is_stdout:
+            self.raw.file.close()
+        path = self.format.chunk_path(self.path, index) if not self.is_stdout else '-'
+        self.chunks.append({'file': os.path.basename(path), 'lines': lines, 'bytes': nbytes,
+                            'size': self.raw.size, 'sha256': self.raw.digest.hexdigest()})
+        self.raw = None
+        if self.format.is_chunked:
+            self._write_manifest(False)
+
+    def _write_manifest(self, complete: bool):
+        manifest = {'output': os.path.basename(self.path), 'format': str(self.format),
+                    'compression': self.format.compression, 'complete': complete,
+                    'lines': sum(chunk['lines'] for chunk in self.chunks),
+                    'bytes': sum(chunk['bytes'] for chunk in self.chunks),
+                    'chunks': self.chunks}
+        # Replaced atomically, so a reader never sees half a manifest
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+
+def _line_blocks(f: BinaryIO, size: Optional[int] = None,
+                 block_size: int = 1 << 20) -> Iterator[List[str]]:
+    rest = b''
+    while size is None or size > 0:
+        data = f.read(block_size if size is None else min(block_size, size))
+        if not data:
+            break
+        if size is not None:
+            size -= len(data)
+        lines = (rest + data).split(b'\n')
+        rest = lines.pop()
+        yield [line.decode('utf-8', errors='surrogateescape') for line in lines]
+
+
+def written_lines(path: str, position: dict,
+                  output_format: Optional[OutputFormat] = None) -> Iterator[List[str]]:
+    """Blocks of the lines a LineWriter wrote up to position (see
+    LineWriter.position), e.g. to refill a dedupe filter when a run resumes.
+    Compressed or chunked output must already be cut back to position, as
+    reopening the LineWriter with it does."""
+    output_format = output_format or OutputFormat()
+    if output_format.is_plain:
+        with open(path, 'rb') as f:
+            yield from _line_blocks(f, position['output_bytes'])
+        return
+    for index in range(position['chunk'] + 1):
+        chunk = output_format.chunk_path(path, index)
+        if os.path.exists(chunk):
+            with open_reader(chunk) as f:
+                yield from _line_blocks(f)
+
+
+def parse_size(text: str) -> int:
+    """Byte count such as 4096, 64K, 500M or 2G (powers of 1024)."""
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+    spec = text.strip().upper().removesuffix('B')
+    scale = units.get(spec[-1:], 1)
+    try:
+        size = int(float(spec[:-1] if scale > 1 else spec) * scale)
+    except ValueError:
+        raise ValueError(f"invalid size {text!r}, expected e.g. 500M or 2G") from None
+    return size
+
+
+def add_output_arguments(parser):
+    """Register the compression and chunking options shared by the generators."""
+    parser.add_argument("--compress", choices=list(CODECS),
+                        help="Compress the output on a background thread (default: from the "
+                             "output extension, .gz, .xz or .zst; zstd needs zstandard)")
+    parser.add_argument("--compress-level", type=int, metavar="N",
+                        help="Compression level (default: 1 for gzip, 3 for xz and zstd)")
+    parser.add_argument("--chunk-lines", type=int, metavar="N",
+                        help="Split the output into files of N lines, listed in "
+                             "<output>.manifest.json")
+    parser.add_argument("--chunk-size", metavar="SIZE",
+                        help="Split the output into files of at most SIZE uncompressed bytes "
+                             "(e.g. 500M, 2G), listed in <output>.manifest.json")
+
+
+def output_format_from_args(args, output_file: Optional[str]) -> OutputFormat:
+    """The output format requested on the command line for output_file (None for stdout)."""
+    compression = args.compress or codec_for_path(output_file)
+    chunk_bytes = parse_size(args.chunk_size) if args.chunk_size else None
+    output_format = OutputFormat(compression, args.compress_level, args.chunk_lines, chunk_bytes)
+    if output_format.is_chunked and (output_file is None or output_file == '-'):
+        raise ValueError("chunked output needs an output file, not stdout")
+    return output_format
+
+
+def handle_broken_pipe():
+    """Silence stdout after the reading end of a pipe has gone away.
+
+    Python flushes stdout at exit, which would raise again; pointing the file
+    descriptor at /dev/null lets the process exit quietly.
+    """
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+    os.close(devnull)
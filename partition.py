@@ -0,0 +1,92 @@
+import argparse
+import zlib
+from typing import Optional, Tuple
+
+
+class Partition:
+    """One node's share of an ordered sequence of units: shard index of count,
+    then skip/limit within that shard.
+
+    Shards are contiguous, so for a known total every node computes its own
+    start offset and jumps there directly. Together the shards of a run cover
+    every unit exactly once.
+    """
+
+    def __init__(self, skip: int = 0, limit: Optional[int] = None,
+                 index: int = 0, count: int = 1):
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"invalid shard {index + 1}/{count}")
+        if skip < 0 or (limit is not None and limit < 0):
+            raise ValueError("skip and limit must not be negative")
+        self.skip = skip
+        self.limit = limit
+        self.index = index
+        self.count = count
+
+    @property
+    def is_whole(self) -> bool:
+        return self.count == 1 and self.skip == 0 and self.limit is None
+
+    @property
+    def needs_total(self) -> bool:
+        return self.count > 1
+
+    def range(self, total: Optional[int] = None) -> Tuple[int, Optional[int]]:
+        """(start, stop) unit indices for this node; stop is None if unbounded."""
+        if self.count > 1:
+            if total is None:
+                raise ValueError("sharding needs the total number of units")
+            start = total * self.index // self.count
+            stop = total * (self.index + 1) // self.count
+        else:
+            start, stop = 0, total
+        start += self.skip
+        if self.limit is not None:
+            stop = start + self.limit if stop is None else min(stop, start + self.limit)
+        if stop is not None:
+            start = min(start, stop)
+        return start, stop
+
+    def owns(self, candidate: str) -> bool:
+        """Stable owner test for candidates that have no index, e.g. random samples."""
+        if self.count == 1:
+            return True
+        data = candidate.encode('utf-8', errors='surrogateescape')
+        return zlib.crc32(data) % self.count == self.index
+
+    def __str__(self) -> str:
+        parts = []
+        if self.count > 1:
+            parts.append(f"shard {self.index + 1}/{self.count}")
+        if self.skip:
+            parts.append(f"skip {self.skip:,}")
+        if self.limit is not None:
+            parts.append(f"limit {self.limit:,}")
+        return ", ".join(parts) or "everything"
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """argparse type for 'i/N' with 1 <= i <= N."""
+    index, sep, count = spec.partition('/')
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        index = count = 0
+    if not sep or count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"expected i/N with 1 <= i <= N, got {spec!r}")
+    return index - 1, count
+
+
+def add_partition_arguments(parser, unit: str = "candidates"):
+    """Register the --skip/--limit/--shard options shared by the generators."""
+    parser.add_argument("--shard", type=parse_shard, metavar="I/N",
+                        help=f"Only produce share I of N (1-based) of the {unit}")
+    parser.add_argument("--skip", type=int, default=0,
+                        help=f"Skip this many {unit} of the (shard's) sequence")
+    parser.add_argument("--limit", type=int,
+                        help=f"Stop after this many {unit} of the (shard's) sequence")
+
+
+def partition_from_args(args) -> Partition:
+    index, count = args.shard or (0, 1)
+    return Partition(skip=args.skip, limit=args.limit, index=index, count=count)
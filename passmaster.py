@@ -3,9 +3,21 @@ import string
 import requests
 import datetime
 import itertools
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
+import os
 import sys
 import time
+import argparse
+from checkpoint import add_checkpoint_arguments, checkpoint_from_args
+from dedupe import CompactSet
+from estimate import Estimate, format_report
+from leet import LeetEngine
+from output import (LineWriter, OutputFormat, add_output_arguments, handle_broken_pipe,
+                    output_format_from_args, written_lines)
+from partition import Partition, add_partition_arguments, partition_from_args
+from policy import Policy, add_policy_arguments, classes_of, policy_from_args
+from rank import add_rank_arguments, ranker_from_args
+from wordsource import WordSource, add_source_arguments, source_from_args
 
 class PasswordGenerator:
     def __init__(self):
@@ -14,6 +26,11 @@ class PasswordGenerator:
         self.progress = 0
         self.min_length = 8
         self.max_length = 12
+        self.log_stream = sys.stdout
+        self.quiet = False
+        self.word_source = WordSource()
+        self.partition = Partition()
+        self.policy = Policy(self.min_length, self.max_length)
        
         # Common patterns and components
         self.patterns = {
@@ -38,10 +55,13 @@ class PasswordGenerator:
                 'z': ['2']
             }
         }
+        self.leet_max = 256
+        self.leet = LeetEngine(self.patterns['leet_replacements'], self.leet_max)
+        self.index_patterns()
 
     def fetch_words(self):
         """Fetch base words for password generation"""
-        print("Fetching base words...")
+        self.log("Fetching base words...")
        
         # Common base words
         base_words = [
@@ -54,130 +74,421 @@ class PasswordGenerator:
             "winter", "summer", "spring", "autumn", "star"
         ]
        
-        try:
-            # Try to fetch additional words from API
-            response = requests.get("https://random-word-api.herokuapp.com/word?number=100")
-            if response.status_code == 200:
-                api_words = [word.lower() for word in response.json()
-                           if self.min_length <= len(word) <= self.max_length]
-                base_words.extend(api_words)
-        except:
-            pass
+        # Additional words from the API, cached on disk between runs
+        api_words = self.word_source.get(
+            "passmaster", "https://random-word-api.herokuapp.com/word?number=100", [])
+        base_words.extend(word.lower() for word in api_words
+                          if self.min_length <= len(word) <= self.max_length)
        
         self.words = set(base_words)
-        print(f"Loaded {len(self.words)} base words")
+        self.log(f"Loaded {len(self.words)} base words")
+
+    def selected_words(self):
+        """Base words in sorted order, restricted to this node's partition"""
+        words = sorted(self.words)
+        start, stop = self.partition.range(len(words))
+        return words[start:stop]
 
     def apply_leet(self, word):
-        """Apply leet speak transformations"""
-        variations = {word}
-       
-        for char, replacements in self.patterns['leet_replacements'].items():
-            new_variations = set()
-            for current in variations:
-                if char in current.lower():
-                    for replacement in replacements:
-                        new_variations.add(current.lower().replace(char, replacement))
-            variations.update(new_variations)
-       
-        return variations
+        """Lazily apply per-position leet speak to the lower-cased word"""
+        yield word
+        yield from itertools.islice(self.leet.variants(word.lower()), 1, None)
+
+    def set_policy(self, policy):
+        """Target a password policy; its length window replaces min/max_length"""
+        self.policy = policy
+        self.min_length = policy.min_length
+        self.max_length = policy.max_length
+        self.index_patterns()
+
+    def index_patterns(self):
+        """Index every pattern list by string length for the generation planner.
+
+        Values with characters the policy bans are dropped here, and the
+        character classes each list can contribute are recorded so whole
+        pattern groups that cannot meet the policy are skipped per word.
+        """
+        banned = self.policy.banned
+        self.pattern_lengths = {}
+        self.pattern_classes = {}
+        self.longest = {}
+        for key, values in self.patterns.items():
+            if isinstance(values, list):
+                index = {}
+                for value in values:
+                    if banned.isdisjoint(value):
+                        index.setdefault(len(value), []).append(value)
+                self.pattern_lengths[key] = index
+                self.pattern_classes[key] = classes_of(''.join(v for vs in index.values() for v in vs))
+                self.longest[key] = max(index, default=0)
+        replacements = [r for rs in self.patterns['leet_replacements'].values() for r in rs]
+        self.leet_growth = max(len(r) for r in replacements) - 1
+        self.leet_classes = classes_of(''.join(replacements))
+
+    def fitting(self, key, lo, hi, repeat=1):
+        """Values of a pattern list whose length (times repeat) lies within [lo, hi]"""
+        for length, values in self.pattern_lengths[key].items():
+            if lo <= length * repeat <= hi:
+                yield from values
 
     def generate_word_variations(self, word):
-        """Generate variations of a single word"""
+        """Generate variations of a single word.
+
+        Component lengths and character classes are known up front, so only
+        combinations that can land inside the min_length..max_length window
+        and meet the policy's class requirements are ever built.
+        """
         variations = set()
+        lo, hi = self.min_length, self.max_length
+        fitting = self.fitting
+        policy = self.policy
+        classes = self.pattern_classes
        
-        # Base variations
-        base_variations = [
+        # Base variations (capitalize and title usually coincide)
+        base_variations = dict.fromkeys([
             word.lower(),
             word.capitalize(),
             word.upper(),
             word.title()
-        ]
+        ])
        
         # Apply patterns to each base variation
         for base in base_variations:
+            n = len(base)
+            base_classes = classes_of(base)
+
+            def can(*keys):
+                return policy.possible(base_classes.union(*(classes[key] for key in keys)))
+
+            # Add leet speak variations, which may also replace banned characters
+            if (n <= hi and n * (1 + self.leet_growth) >= lo
+                    and policy.possible(base_classes | self.leet_classes | {'lower'})):
+                variations.update(v for v in self.apply_leet(base) if lo <= len(v) <= hi)
+
+            # Every other group keeps the base as it is
+            if not policy.banned.isdisjoint(base):
+                continue
+
             # Add numbers
-            for num in self.patterns['numbers']:
-                variations.add(f"{base}{num}")
-                variations.add(f"{num}{base}")
+            if can('numbers'):
+                for num in fitting('numbers', lo - n, hi - n):
+                    variations.add(f"{base}{num}")
+                    variations.add(f"{num}{base}")
            
             # Add special characters
-            for char in self.patterns['special_chars']:
-                variations.add(f"{base}{char}")
-                variations.add(f"{char}{base}")
-                variations.add(f"{base}{char}{char}")
+            if can('special_chars'):
+                for char in fitting('special_chars', lo - n, hi - n):
+                    variations.add(f"{base}{char}")
+                    variations.add(f"{char}{base}")
+                for char in fitting('special_chars', lo - n, hi - n, repeat=2):
+                    variations.add(f"{base}{char}{char}")
            
             # Add year combinations
-            for year in self.patterns['years']:
-                variations.add(f"{base}{year}")
+            if can('years'):
+                for year in fitting('years', lo - n, hi - n):
+                    variations.add(f"{base}{year}")
            
             # Add month combinations
-            for month in self.patterns['months']:
-                variations.add(f"{base}{month}")
+            if can('months'):
+                for month in fitting('months', lo - n, hi - n):
+                    variations.add(f"{base}{month}")
                
             # Add prefix-suffix combinations
-            for prefix in self.patterns['common_prefixes']:
-                for suffix in self.patterns['common_suffixes']:
-                    variations.add(f"{prefix}{base}{suffix}")
-           
-            # Add leet speak variations
-            variations.update(self.apply_leet(base))
+            if can('common_prefixes', 'common_suffixes'):
+                for prefix in fitting('common_prefixes', lo - n - self.longest['common_suffixes'], hi - n):
+                    rest = n + len(prefix)
+                    for suffix in fitting('common_suffixes', lo - rest, hi - rest):
+                        variations.add(f"{prefix}{base}{suffix}")
            
             # Add special combinations
-            for num in self.patterns['numbers']:
-                for char in self.patterns['special_chars']:
-                    variations.add(f"{base}{num}{char}")
-                    variations.add(f"{base}{char}{num}")
-                    variations.add(f"{num}{base}{char}")
-
-        return {v for v in variations
-                if self.min_length <= len(v) <= self.max_length}
-
-    def password_generator(self, num_passwords):
-        """Generate passwords within length constraints"""
-        used_passwords = set()
+            if can('numbers', 'special_chars'):
+                for num in fitting('numbers', lo - n - self.longest['special_chars'], hi - n):
+                    rest = n + len(num)
+                    for char in fitting('special_chars', lo - rest, hi - rest):
+                        variations.add(f"{base}{num}{char}")
+                        variations.add(f"{base}{char}{num}")
+                        variations.add(f"{num}{base}{char}")
+
+        # Exact check for what the group-level pruning cannot decide
+        if not policy.is_length_only:
+            variations = {v for v in variations if policy.allows(v)}
+        return variations
+
+    def estimate_word(self, word):
+        """Count candidates per pattern group for one word, honouring the length window"""
+        def fits(length):
+            return self.min_length <= length <= self.max_length
+
+        p = self.patterns
+        counts = dict.fromkeys(['Numbers', 'Special chars', 'Years', 'Months',
+                                'Prefix + suffix', 'Leet speak', 'Number + special'], 0)
+        for base in {word.lower(), word.capitalize(), word.upper(), word.title()}:
+            n = len(base)
+            counts['Numbers'] += 2 * sum(fits(n + len(num)) for num in p['numbers'])
+            counts['Special chars'] += len(p['special_chars']) * (2 * fits(n + 1) + fits(n + 2))
+            counts['Years'] += sum(fits(n + len(year)) for year in p['years'])
+            counts['Months'] += sum(fits(n + len(month)) for month in p['months'])
+            counts['Prefix + suffix'] += sum(fits(len(prefix) + n + len(suffix))
+                                             for prefix in p['common_prefixes']
+                                             for suffix in p['common_suffixes'])
+            counts['Leet speak'] += fits(n) * self.leet.count(base.lower())
+            counts['Number + special'] += 3 * len(p['special_chars']) * sum(
+                fits(n + len(num) + 1) for num in p['numbers'])
+        return counts
+
+    def estimate(self, num_passwords, sample_size=200):
+        """Estimate output size from the pattern tables without generating everything"""
+        self.fetch_words()
+        words = self.selected_words()
+
+        totals = {}
+        for word in words:
+            for name, count in self.estimate_word(word).items():
+                totals[name] = totals.get(name, 0) + count
+        generated = sum(totals.values())
+
+        # Deduplication ratio and average length measured on a sample of words
+        sample = words[:sample_size]
+        sample_generated = sum(sum(self.estimate_word(word).values()) for word in sample)
+        sample_unique = set()
+        for word in sample:
+            sample_unique.update(self.generate_word_variations(word))
+        ratio = len(sample_unique) / sample_generated if sample_generated else 0
+        avg_length = (sum(len(v) for v in sample_unique) / len(sample_unique)
+                      if sample_unique else 0)
+
+        estimates = [Estimate(name, count) for name, count in totals.items()]
+        unique = min(generated * ratio, num_passwords)
+        total = Estimate("Total", generated, unique, avg_length)
+        return format_report(f"Estimate for {len(words)} base words "
+                             f"(length {self.min_length}-{self.max_length}, "
+                             f"limit {num_passwords:,})", estimates, total)
+
+    def batch_variations(self, words):
+        """Variations of a batch of words in word order, each word's sorted,
+        with duplicates inside the batch removed"""
+        seen = set()
+        batch = []
+        for word in words:
+            for password in sorted(self.generate_word_variations(word)):
+                if password not in seen:
+                    seen.add(password)
+                    batch.append(password)
+        return batch
+
+    def worker_settings(self):
+        """Attributes a pool worker needs to reproduce this generator"""
+        return {'min_length': self.min_length, 'max_length': self.max_length,
+                'patterns': self.patterns, 'leet_max': self.leet_max, 'policy': self.policy}
+
+    def variation_batches(self, words, workers=1):
+        """Yield (words consumed so far, batch_variations) for consecutive
+        slices of words, in order"""
+        if workers <= 1:
+            for done, word in enumerate(words, 1):
+                yield done, self.batch_variations([word])
+            return
+
+        size = max(1, len(words) // (workers * 4))
+        slices = [words[i:i + size] for i in range(0, len(words), size)]
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                       initargs=(self.worker_settings(),))
+        try:
+            for i, batch in enumerate(executor.map(_batch_variations, slices)):
+                yield min((i + 1) * size, len(words)), batch
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def password_batches(self, num_passwords, workers=1, resume=None, written=()):
+        """Yield (next base word, new passwords) per batch of base words.
+
+        Words are processed in sorted order, so the first num_passwords results
+        are the same for any number of workers. A partition selects a contiguous
+        slice of the sorted words; num_passwords then caps this node's output.
+        resume is a state saved by generate_passwords, with written holding the
+        blocks of passwords already written, to continue an interrupted run.
+        """
+        used_passwords = CompactSet()
+        produced = 0
+        words = self.selected_words()
+        start = 0
+        if resume is not None:
+            start = resume['word']
+            produced = self.progress = resume['written']
+            for block in written:
+                used_passwords.add_many(block)
        
-        for word in self.words:
-            variations = self.generate_word_variations(word)
-           
-            for password in variations:
-                if len(used_passwords) >= num_passwords:
-                    return
-               
-                if (password not in used_passwords and
-                    self.min_length <= len(password) <= self.max_length):
-                    used_passwords.add(password)
-                    yield password
-                   
-                    self.progress += 1
-                    if self.progress % 1000 == 0:
-                        self.print_progress(self.progress, num_passwords)
+        for done, variations in self.variation_batches(words[start:], workers):
+            fresh = used_passwords.add_many([password for password in variations
+                                             if self.min_length <= len(password) <= self.max_length])
+            fresh = fresh[:num_passwords - produced]
+            produced += len(fresh)
+            yield start + done, fresh
+            before = self.progress
+            self.progress += len(fresh)
+            if self.progress // 1000 > before // 1000:
+                self.print_progress(self.progress, num_passwords)
+            if produced >= num_passwords:
+                return
+
+    def password_generator(self, num_passwords, workers=1):
+        """Generate passwords within length constraints (see password_batches)."""
+        for _, passwords in self.password_batches(num_passwords, workers):
+            yield from passwords
+
+    def log(self, message, end="\n"):
+        """Write a status message unless running quietly"""
+        if not self.quiet:
+            self.log_stream.write(f"{message}{end}")
+            self.log_stream.flush()
 
     def print_progress(self, current, total):
         """Display progress bar"""
         progress = (current / total) * 100
-        sys.stdout.write(f'\rProgress: [{current}/{total}] {progress:.1f}%')
-        sys.stdout.flush()
+        self.log(f'\rProgress: [{current}/{total}] {progress:.1f}%', end="")
 
-    def generate_passwords(self, output_file, num_passwords=250000):
-        """Main password generation function"""
-        print(f"Starting password generation (length {self.min_length}-{self.max_length})...")
-       
-        self.fetch_words()
-       
-        with open(output_file, 'w', encoding='utf-8') as f:
-            for password in self.password_generator(num_passwords):
-                f.write(f"{password}\n")
-               
-        print(f"\nCompleted! Generated {self.progress} passwords")
+    def iter_passwords(self, num_passwords=250000, workers=1, ranker=None, words=None):
+        """Lazily yield up to num_passwords passwords for in-process use.
+
+        words replaces the base words (any iterable, e.g. another generator's
+        output); otherwise they are fetched on first use. With a ranker the
+        passwords come most likely first, once generation has finished.
+        """
+        if words is not None:
+            self.words = set(words)
+        elif not self.words:
+            self.fetch_words()
+        if ranker is None:
+            yield from self.password_generator(num_passwords, workers)
+            return
+        try:
+            ranker.write_lines(self.password_generator(num_passwords, workers))
+            yield from ranker.drain()
+        finally:
+            ranker.cleanup()
+
+    def generate_passwords(self, output_file, num_passwords=250000, workers=1, ranker=None,
+                           checkpoint=None, output_format=None):
+        """Main password generation function, writing to stdout when output_file is None.
+
+        output_format compresses or chunks the output (see OutputFormat).
+        With a ranker the passwords are written most likely first. With a
+        checkpoint, the base words, the next word to process and the output
+        size are saved as the job goes; a resumed job reuses those words, so
+        its output is identical to an uninterrupted run.
+        """
+        if output_file is None:
+            self.log_stream = sys.stderr
+        self.log(f"Starting password generation ({self.policy})...")
+        output_format = output_format or OutputFormat()
+
+        job = state = None
+        if checkpoint is not None:
+            if ranker is not None:
+                raise ValueError("ranked output cannot be checkpointed")
+            job = {'tool': 'passmaster', 'output': os.path.abspath(output_file),
+                   'count': num_passwords, 'policy': str(self.policy),
+                   'partition': str(self.partition), 'leet_max': self.leet_max,
+                   'output_format': str(output_format)}
+            state = checkpoint.load(job)
+        if state is None:
+            self.fetch_words()
+        else:
+            self.words = set(state['words'])
+            self.log(f"Resuming after {state['written']} passwords")
+        if not self.partition.is_whole:
+            self.log(f"Partition: {self.partition} of {len(self.words)} base words")
+
+        resume = {} if state is None else {'resume': state['output'],
+                                           'resume_count': state['written']}
+        with LineWriter(output_file, output_format=output_format, **resume) as writer:
+            if checkpoint is None:
+                writer.write_lines(self.iter_passwords(num_passwords, workers, ranker))
+            else:
+                words = sorted(self.words)
+                written = (written_lines(output_file, state['output'], output_format)
+                           if state else ())
+                for word, passwords in self.password_batches(num_passwords, workers, state,
+                                                             written):
+                    writer.write_lines(passwords)
+                    if checkpoint.due():
+                        checkpoint.save(job, {'words': words, 'word': word,
+                                              'written': writer.count,
+                                              'output': writer.position()})
+
+        if checkpoint is not None:
+            checkpoint.clear()
+        self.log(f"\nCompleted! Generated {self.progress} passwords")
+
+# Per-process generator used by pool workers
+_worker = None
+
+def _init_worker(settings):
+    global _worker
+    _worker = PasswordGenerator()
+    for name, value in settings.items():
+        setattr(_worker, name, value)
+    _worker.leet = LeetEngine(_worker.patterns['leet_replacements'], _worker.leet_max)
+    _worker.index_patterns()
+
+def _batch_variations(words):
+    return _worker.batch_variations(words)
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate passwords from common base words")
+    parser.add_argument("-o", "--output", default="passwords_8_12.txt",
+                        help="Output file (default: passwords_8_12.txt)")
+    parser.add_argument("-n", "--count", type=int, default=50000,
+                        help="Number of passwords to generate (default: 50000)")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Number of worker processes (default: 1)")
+    parser.add_argument("--stdout", action="store_true",
+                        help="Write passwords to stdout for piping; progress goes to stderr")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Disable progress output")
+    parser.add_argument("--estimate", "--dry-run", action="store_true",
+                        help="Print expected candidate counts and output size, then exit")
+    add_source_arguments(parser)
+    add_partition_arguments(parser, unit="base words")
+    add_policy_arguments(parser)
+    add_rank_arguments(parser)
+    add_checkpoint_arguments(parser)
+    add_output_arguments(parser)
+    args = parser.parse_args()
+    try:
+        policy = policy_from_args(args, min_length=8, max_length=12)
+    except ValueError as e:
+        parser.error(f"invalid policy: {e}")
+    try:
+        checkpoint = checkpoint_from_args(args, None if args.stdout else args.output)
+        output_format = output_format_from_args(args, None if args.stdout else args.output)
+    except ValueError as e:
+        parser.error(str(e))
+    if checkpoint is not None and args.rank:
+        parser.error("--rank output cannot be checkpointed")
+
     try:
         generator = PasswordGenerator()
-        generator.generate_passwords("passwords_8_12.txt", 50000)
+        generator.quiet = args.quiet
+        generator.word_source = source_from_args(args)
+        generator.partition = partition_from_args(args)
+        generator.set_policy(policy)
+        if args.estimate:
+            # Keep stdout for the report alone, so it can be parsed
+            generator.log_stream = sys.stderr
+            print(generator.estimate(args.count))
+            return
+        generator.generate_passwords(None if args.stdout else args.output, args.count,
+                                     args.workers, ranker_from_args(args), checkpoint,
+                                     output_format)
+    except BrokenPipeError:
+        handle_broken_pipe()
+        sys.exit(1)
     except KeyboardInterrupt:
-        print("\nGeneration interrupted by user")
+        print("\nGeneration interrupted by user", file=sys.stderr)
+        if checkpoint is not None:
+            print(f"Continue with --resume (checkpoint: {checkpoint.path})", file=sys.stderr)
     except Exception as e:
-        print(f"\nError during generation: {e}")
+        print(f"\nError during generation: {e}", file=sys.stderr)
 
 if __name__ == "__main__":
     requests.packages.urllib3.disable_warnings()
@@ -0,0 +1,146 @@
+import re
+from typing import FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+CLASSES = ('lower', 'upper', 'digit', 'special')
+
+_DIGIT = re.compile(r'\d')
+_SPECIAL = re.compile(r'[\W_]')
+
+
+def _has_lower(text: str) -> bool:
+    return text != text.upper()
+
+
+def _has_upper(text: str) -> bool:
+    return text != text.lower()
+
+
+_CLASS_TESTS = {
+    'lower': _has_lower,
+    'upper': _has_upper,
+    'digit': lambda text: _DIGIT.search(text) is not None,
+    'special': lambda text: _SPECIAL.search(text) is not None,
+}
+
+
+def classes_of(text: str) -> FrozenSet[str]:
+    """Character classes that occur in text."""
+    return frozenset(name for name, test in _CLASS_TESTS.items() if test(text))
+
+
+class Policy:
+    """Password policy: length window, required character classes, banned
+    characters and a cap on runs of one repeated character.
+
+    The checks are compiled once into a short list of C-level tests, so
+    allows() is cheap enough for every candidate. Generators also use
+    possible() and compile_shapes() to skip whole branches that can never
+    satisfy the policy before building any candidate from them.
+    """
+
+    def __init__(self, min_length: int = 0, max_length: Optional[int] = None,
+                 require: Iterable[str] = (), banned: str = '',
+                 max_repeat: Optional[int] = None):
+        self.min_length = min_length
+        self.max_length = max_length
+        self.require = frozenset(require)
+        unknown = self.require - set(CLASSES)
+        if unknown:
+            raise ValueError(f"unknown character classes: {', '.join(sorted(unknown))}")
+        if max_length is not None and max_length < min_length:
+            raise ValueError(f"max length {max_length} is below min length {min_length}")
+        if max_repeat is not None and max_repeat < 1:
+            raise ValueError("max repeat must be at least 1")
+        self.banned = frozenset(banned)
+        self.max_repeat = max_repeat
+
+        self.tests = [_CLASS_TESTS[name] for name in CLASSES if name in self.require]
+        if self.banned:
+            banned_re = re.compile('[' + ''.join(re.escape(c) for c in sorted(self.banned)) + ']')
+            self.tests.append(lambda text: banned_re.search(text) is None)
+        if max_repeat is not None:
+            repeat_re = re.compile(r'(.)\1{%d}' % max_repeat, re.DOTALL)
+            self.tests.append(lambda text: repeat_re.search(text) is None)
+
+    def __getstate__(self):
+        # The compiled tests are closures; rebuild them instead of pickling
+        return (self.min_length, self.max_length, tuple(self.require),
+                ''.join(self.banned), self.max_repeat)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    @property
+    def is_length_only(self) -> bool:
+        return not self.tests
+
+    def allows(self, password: str) -> bool:
+        """True if password satisfies every rule of the policy."""
+        length = len(password)
+        if length < self.min_length or (self.max_length is not None and length > self.max_length):
+            return False
+        for test in self.tests:
+            if not test(password):
+                return False
+        return True
+
+    def filter(self, passwords: Iterable[str]) -> List[str]:
+        return [password for password in passwords if self.allows(password)]
+
+    def fits(self, lo: int, hi: Optional[int] = None) -> bool:
+        """True if some length in [lo, hi] lies inside the length window."""
+        hi = lo if hi is None else hi
+        return hi >= self.min_length and (self.max_length is None or lo <= self.max_length)
+
+    def possible(self, classes: Iterable[str]) -> bool:
+        """True if candidates drawing only on these classes can meet the requirements."""
+        return self.require <= set(classes)
+
+    def allowed_chars(self, charset: str) -> str:
+        """charset without the banned characters."""
+        return ''.join(c for c in charset if c not in self.banned) if self.banned else charset
+
+    def compile_shapes(self, shapes: Sequence[Sequence[Tuple[str, int]]]) -> List[List[Tuple[str, int]]]:
+        """Restrict (charset, length) shapes to the policy: banned characters are
+        removed from the charsets and shapes that can never pass are dropped."""
+        compiled = []
+        for shape in shapes:
+            segments = [(self.allowed_chars(charset), length) for charset, length in shape]
+            if any(length and not charset for charset, length in segments):
+                continue
+            if not self.fits(sum(length for _, length in segments)):
+                continue
+            if not self.possible(set().union(*(classes_of(charset) for charset, length in segments
+                                               if length))):
+                continue
+            compiled.append(segments)
+        return compiled
+
+    def __str__(self) -> str:
+        parts = [f"length {self.min_length}-{'' if self.max_length is None else self.max_length}"]
+        if self.require:
+            parts.append("requires " + "+".join(name for name in CLASSES if name in self.require))
+        if self.banned:
+            parts.append("bans " + repr(''.join(sorted(self.banned))))
+        if self.max_repeat is not None:
+            parts.append(f"max repeat {self.max_repeat}")
+        return ", ".join(parts)
+
+
+def add_policy_arguments(parser):
+    """Register the password policy options shared by the generators."""
+    parser.add_argument("--min-length", type=int, help="Minimum password length")
+    parser.add_argument("--max-length", type=int, help="Maximum password length")
+    parser.add_argument("--require", default="",
+                        help="Required character classes, comma separated: lower,upper,digit,special")
+    parser.add_argument("--ban", default="", metavar="CHARS", help="Characters passwords must not contain")
+    parser.add_argument("--max-repeat", type=int,
+                        help="Longest allowed run of one repeated character")
+
+
+def policy_from_args(args, min_length: int = 0, max_length: Optional[int] = None) -> Policy:
+    """Build the policy from the command line, with the tool's own length window as default."""
+    require = [name.strip() for name in args.require.split(',') if name.strip()]
+    return Policy(min_length=min_length if args.min_length is None else args.min_length,
+                  max_length=max_length if args.max_length is None else args.max_length,
+                  require=require, banned=args.ban, max_repeat=args.max_repeat)
@@ -0,0 +1,170 @@
+import math
+import os
+import shutil
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from wordfile import WordFile
+
+# Padding symbols; neither can occur inside a candidate line
+START = '\x02'
+END = '\n'
+
+# Rough cost of one buffered str (object header + list slot)
+ENTRY_OVERHEAD = 64
+
+
+class MarkovModel:
+    """Character-level Markov model of a password list.
+
+    cost() is the negative log2 probability of a candidate, including the end
+    of the word, so lower is more likely. Transitions use add-one smoothing
+    over the characters seen in training.
+    """
+
+    def __init__(self, order: int = 3):
+        self.order = order
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self.words = 0
+        self.tables: Optional[Dict[str, Tuple[Dict[str, float], float]]] = None
+
+    def train(self, words: Iterable[str]):
+        order = self.order
+        counts = self.counts
+        for word in words:
+            padded = START * order + word + END
+            for i in range(order, len(padded)):
+                following = counts.setdefault(padded[i - order:i], {})
+                char = padded[i]
+                following[char] = following.get(char, 0) + 1
+            self.words += 1
+        self.tables = None
+
+    def train_file(self, path: str):
+        with WordFile(path) as wordfile:
+            self.train(word for _, word in wordfile.words())
+
+    def compile(self):
+        """Turn counts into per-context cost tables."""
+        alphabet = {END}
+        for following in self.counts.values():
+            alphabet.update(following)
+        size = len(alphabet)
+        self.unseen = math.log2(size)
+        self.tables = {}
+        for context, following in self.counts.items():
+            total = sum(following.values()) + size
+            self.tables[context] = ({char: math.log2(total / (n + 1))
+                                     for char, n in following.items()}, math.log2(total))
+
+    def cost(self, candidate: str) -> float:
+        """Bits needed to encode candidate under the model."""
+        if self.tables is None:
+            self.compile()
+        tables = self.tables
+        unseen = self.unseen
+        order = self.order
+        padded = START * order + candidate + END
+        bits = 0.0
+        for i in range(order, len(padded)):
+            table = tables.get(padded[i - order:i])
+            if table is None:
+                bits += unseen
+            else:
+                bits += table[0].get(padded[i], table[1])
+        return bits
+
+
+class RankedSpill:
+    """Bounded-memory, approximate best-first ordering of candidates.
+
+    Candidates are binned by model cost into buckets bucket_width bits wide.
+    Buffered buckets are appended to per-bucket temp files once memory_limit
+    bytes are held, and drain() replays the buckets cheapest first. Order is
+    exact between buckets and arrival order within one, so the output is
+    roughly in descending probability without ever sorting it. write() and
+    write_lines() mirror LineWriter, so a ranker can stand in for the output
+    while a generator runs.
+    """
+
+    def __init__(self, model: MarkovModel, memory_limit: int = 256 * 1024 * 1024,
+                 tmp_dir: Optional[str] = None, bucket_width: float = 0.5,
+                 buckets: int = 256):
+        self.model = model
+        self.memory_limit = memory_limit
+        self.bucket_width = bucket_width
+        self.buffers: List[List[str]] = [[] for _ in range(buckets)]
+        self.buffer_bytes = 0
+        self.spilled = [False] * buckets
+        self.directory = tempfile.mkdtemp(prefix="rank_", dir=tmp_dir)
+        self.count = 0
+
+    def _path(self, bucket: int) -> str:
+        return os.path.join(self.directory, f"{bucket:04d}.txt")
+
+    def write(self, candidate: str):
+        bucket = min(int(self.model.cost(candidate) / self.bucket_width), len(self.buffers) - 1)
+        self.buffers[bucket].append(candidate)
+        self.buffer_bytes += ENTRY_OVERHEAD + len(candidate)
+        self.count += 1
+        if self.buffer_bytes >= self.memory_limit:
+            self.spill()
+
+    def write_lines(self, candidates: Iterable[str]):
+        for candidate in candidates:
+            self.write(candidate)
+
+    def spill(self):
+        """Append every buffered bucket to its file."""
+        for bucket, buffer in enumerate(self.buffers):
+            if buffer:
+                with open(self._path(bucket), 'a', encoding='utf-8', errors='surrogateescape',
+                          buffering=1 << 20) as f:
+                    f.writelines(f"{candidate}\n" for candidate in buffer)
+                self.buffers[bucket] = []
+                self.spilled[bucket] = True
+        self.buffer_bytes = 0
+
+    def drain(self) -> Iterator[str]:
+        """Yield every candidate, cheapest bucket first."""
+        for bucket, buffer in enumerate(self.buffers):
+            if self.spilled[bucket]:
+                with open(self._path(bucket), encoding='utf-8', errors='surrogateescape',
+                          buffering=1 << 20) as f:
+                    for line in f:
+                        yield line[:-1]
+                os.remove(self._path(bucket))
+                self.spilled[bucket] = False
+            self.buffers[bucket] = []
+            yield from buffer
+        self.buffer_bytes = 0
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+        return False
+
+
+def add_rank_arguments(parser):
+    """Register the ranked output options shared by the generators."""
+    parser.add_argument("--rank", metavar="WORDLIST",
+                        help="Emit candidates most likely first, scored by a Markov model "
+                             "trained on WORDLIST")
+    parser.add_argument("--rank-order", type=int, default=3,
+                        help="Characters of context for the ranking model (default: 3)")
+
+
+def ranker_from_args(args, memory_limit: int = 256 * 1024 * 1024,
+                     tmp_dir: Optional[str] = None) -> Optional[RankedSpill]:
+    """Train the ranking model named on the command line, if any."""
+    if not args.rank:
+        return None
+    model = MarkovModel(args.rank_order)
+    model.train_file(args.rank)
+    model.compile()
+    return RankedSpill(model, memory_limit, tmp_dir)
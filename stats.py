@@ -0,0 +1,210 @@
+import json
+import time
+from typing import Dict, Iterable, List, Optional
+
+from estimate import format_count
+
+
+class StageStats:
+    """Counters and time for one transformation stage or pattern.
+
+    Every generated candidate ends up in exactly one of unique (passed on),
+    duplicates, length_rejected, policy_rejected (any other policy rule) or
+    skipped (left to another shard). A memoized stage also counts its cache
+    hits, misses and evictions.
+    """
+
+    FIELDS = ('generated', 'unique', 'duplicates', 'length_rejected', 'policy_rejected',
+              'skipped', 'seconds', 'cache_hits', 'cache_misses', 'cache_evictions')
+
+    def __init__(self):
+        self.generated = 0
+        self.unique = 0
+        self.duplicates = 0
+        self.length_rejected = 0
+        self.policy_rejected = 0
+        self.skipped = 0
+        self.seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+
+    def filter(self, policy, candidates: List[str]) -> List[str]:
+        """policy.filter(candidates), counting the rejects by reason."""
+        kept = policy.filter(candidates)
+        rejected = len(candidates) - len(kept)
+        if rejected:
+            length = sum(1 for candidate in candidates if not policy.fits(len(candidate)))
+            self.length_rejected += length
+            self.policy_rejected += rejected - length
+        return kept
+
+    def merge(self, other: 'StageStats'):
+        for field in self.FIELDS:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+
+    def to_dict(self) -> dict:
+        return {field: round(getattr(self, field), 6) for field in self.FIELDS}
+
+
+class RunStats:
+    """Per-stage counters of a generation run plus a throughput series.
+
+    Generators take an optional RunStats and only touch it once per chunk or
+    batch, so a run without one pays nothing. sample() is cheap to call
+    often: it records (seconds, generated, written) at most every
+    sample_every seconds, and halves the series (doubling the interval)
+    whenever it exceeds max_samples, so long runs stay small.
+    """
+
+    def __init__(self, stages: Iterable[str] = (), sample_every: float = 1.0,
+                 max_samples: int = 1000):
+        self.stages: Dict[str, StageStats] = {name: StageStats() for name in stages}
+        self.sample_every = sample_every
+        self.max_samples = max_samples
+        self.started = time.monotonic()
+        self.next_sample = sample_every
+        self.series: List[List[float]] = []
+        self.written = 0
+        self.elapsed = 0.0
+
+    def __getstate__(self):
+        # Workers get a fresh copy; only their stage counters come back
+        return {'stages': list(self.stages)}
+
+    def __setstate__(self, state):
+        self.__init__(state['stages'])
+
+    def stage(self, name: str) -> StageStats:
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats()
+        return stats
+
+    def drain(self) -> Dict[str, StageStats]:
+        """Hand over the stage counters and start again from zero."""
+        stages = self.stages
+        self.stages = {name: StageStats() for name in stages}
+        return stages
+
+    def merge(self, stages: Dict[str, StageStats]):
+        for name, stats in stages.items():
+            self.stage(name).merge(stats)
+
+    @property
+    def generated(self) -> int:
+        return sum(stats.generated for stats in list(self.stages.values()))
+
+    def sample(self, written: int):
+        """Note the candidates written so far, adding a series point when one is due."""
+        self.written = written
+        elapsed = time.monotonic() - self.started
+        if elapsed < self.next_sample:
+            return
+        self.series.append([round(elapsed, 3), self.generated, written])
+        if len(self.series) > self.max_samples:
+            self.series = self.series[1::2]
+            self.sample_every *= 2
+        self.next_sample = elapsed + self.sample_every
+
+    def finish(self, written: int):
+        self.written = written
+        self.elapsed = time.monotonic() - self.started
+        self.series.append([round(self.elapsed, 3), self.generated, written])
+
+    def to_dict(self, **info) -> dict:
+        elapsed = self.elapsed or time.monotonic() - self.started
+        return {**info, 'seconds': round(elapsed, 3), 'generated': self.generated,
+                'written': self.written,
+                'rate': round(self.written / elapsed, 1) if elapsed else 0.0,
+                'stages': {name: stats.to_dict() for name, stats in self.stages.items()},
+                'series': {'fields': ['seconds', 'generated', 'written'],
+                           'points': self.series}}
+
+    def save(self, path: str, **info):
+        """Write the report as JSON; info adds run details such as the tool name."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(**info), f, indent=2)
+
+    def rows(self, count=format_count) -> List[List[str]]:
+        """Report cells per stage and a total: name, generated, unique, duplicate
+        share, rejected for length, rejected by other policy rules, share of
+        time and candidates generated per second. count formats the counts."""
+        stages = list(self.stages.items())
+        seconds = sum(stats.seconds for _, stats in stages) or 1.0
+        total = StageStats()
+        for _, stats in stages:
+            total.merge(stats)
+        rows = []
+        for name, stats in stages + [("Total", total)]:
+            rate = stats.generated / stats.seconds if stats.seconds else 0
+            duplicates = f"{stats.duplicates / stats.generated:.1%}" if stats.generated else "-"
+            rows.append([name, count(stats.generated), count(stats.unique),
+                         duplicates, count(stats.length_rejected), count(stats.policy_rejected),
+                         f"{stats.seconds / seconds:.0%}", format_rate(rate)])
+        return rows
+
+    HEADERS = ["Stage", "Generated", "Unique", "Dupes", "Length", "Policy", "Time", "Rate"]
+
+    def summary(self) -> str:
+        elapsed = self.elapsed or time.monotonic() - self.started
+        rate = self.written / elapsed if elapsed else 0
+        summary = f"Written {self.written:,} in {elapsed:.1f}s ({rate:,.0f}/s)"
+        stages = list(self.stages.values())
+        hits = sum(stats.cache_hits for stats in stages)
+        lookups = hits + sum(stats.cache_misses for stats in stages)
+        if lookups:
+            summary += f", cache hits {hits / lookups:.1%}"
+        return summary
+
+    def table(self):
+        """The report as a rich Table, e.g. for a live progress display."""
+        from rich import box
+        from rich.table import Table
+        # Compact enough for an 80 column terminal
+        table = Table(*self.HEADERS, caption=self.summary(), box=box.SIMPLE_HEAD,
+                      show_edge=False, pad_edge=False, collapse_padding=True)
+        table.columns[0].no_wrap = True
+        for column in table.columns[1:]:
+            column.justify = "right"
+            column.min_width = len(column.header)
+        for row in self.rows(format_short):
+            table.add_row(*row)
+        return table
+
+    def format(self) -> str:
+        """The report as a plain-text table."""
+        widths = [24, 14, 14, 8, 12, 12, 6, 10]
+        header = "".join(f"{name:<{width}}" if i == 0 else f"{name:>{width}}"
+                         for i, (name, width) in enumerate(zip(self.HEADERS, widths)))
+        lines = [header, "-" * len(header)]
+        for row in self.rows():
+            if row[0] == "Total":
+                lines.append("-" * len(header))
+            lines.append("".join(f"{cell:<{width}}" if i == 0 else f"{cell:>{width}}"
+                                 for i, (cell, width) in enumerate(zip(row, widths))))
+        lines.append(self.summary())
+        return "\n".join(lines)
+
+
+def format_short(n: float) -> str:
+    """n in at most five characters or so, e.g. 950, 12.3k, 4.5M."""
+    for scale, unit in ((1e9, "G"), (1e6, "M"), (1e3, "k")):
+        if n >= scale:
+            return f"{n / scale:.{1 if n < scale * 100 else 0}f}{unit}"
+    return f"{n:.0f}"
+
+
+def format_rate(rate: float) -> str:
+    return f"{format_short(rate)}/s"
+
+
+def add_stats_arguments(parser):
+    """Register the run statistics options shared by the generators."""
+    parser.add_argument("--stats", metavar="FILE",
+                        help="Count and time every transformation stage or pattern and write "
+                             "a JSON report with a throughput series to FILE")
+
+
+def stats_from_args(args, stages: Iterable[str] = ()) -> Optional[RunStats]:
+    return RunStats(stages) if args.stats else None
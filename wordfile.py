@@ -0,0 +1,119 @@
+import mmap
+import os
+import shutil
+import tempfile
+from typing import Iterator, Optional, Tuple
+
+from compress import detect, open_reader
+
+# Bytes scanned per step when counting or seeking lines
+BLOCK = 1 << 20
+
+
+class WordFile:
+    """Memory-mapped wordlist, addressed by line number and byte offset.
+
+    Lines are split on raw b'\\n' and stripped of ASCII whitespace. Words are
+    decoded with surrogateescape, so bytes that are not valid UTF-8 survive
+    the round trip to an output written with the same error handler.
+    Worker processes open the file themselves and are only handed
+    (first line, start, end) spans, never the data.
+
+    A gzip, xz or zstd compressed wordlist cannot be mapped, so it is
+    decompressed once into a temporary file in tmp_dir, which is mapped
+    instead (path then names it) and removed on close.
+    """
+
+    def __init__(self, path: str, tmp_dir: Optional[str] = None):
+        self.source = path
+        self.temporary = None
+        if detect(path) is not None:
+            path = self.temporary = _decompressed_copy(path, tmp_dir)
+        self.path = path
+        self.file = open(path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        # An empty file cannot be mapped
+        self.data = (mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                     if self.size else b'')
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+        if self.temporary is not None:
+            os.remove(self.temporary)
+            self.temporary = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def count_lines(self) -> int:
+        """Number of lines, counting a last line without a trailing newline."""
+        count = 0
+        for pos in range(0, self.size, BLOCK):
+            count += self.data[pos:pos + BLOCK].count(b'\n')
+        if self.size and self.data[self.size - 1:self.size] != b'\n':
+            count += 1
+        return count
+
+    def line_at(self, offset: int) -> int:
+        """Number of the line starting at byte offset (a line boundary)."""
+        count = 0
+        for pos in range(0, offset, BLOCK):
+            count += self.data[pos:min(pos + BLOCK, offset)].count(b'\n')
+        return count
+
+    def line_offset(self, line: int) -> int:
+        """Byte offset at which line number line starts (size if past the end)."""
+        pos, seen = 0, 0
+        while pos < self.size:
+            block = self.data[pos:pos + BLOCK]
+            newlines = block.count(b'\n')
+            if seen + newlines >= line:
+                for _ in range(line - seen):
+                    pos = self.data.find(b'\n', pos) + 1
+                return pos
+            seen += newlines
+            pos += len(block)
+        return self.size
+
+    def chunks(self, start: int = 0, end: Optional[int] = None, first_line: int = 0,
+               chunk_bytes: int = 1 << 16) -> Iterator[Tuple[int, int, int]]:
+        """Split [start, end) into (first line, start, end) spans of about
+        chunk_bytes that end on line boundaries."""
+        end = self.size if end is None else end
+        pos, line = start, first_line
+        while pos < end:
+            stop = min(pos + chunk_bytes, end)
+            if stop < end:
+                newline = self.data.find(b'\n', stop - 1, end)
+                stop = end if newline < 0 else newline + 1
+            yield line, pos, stop
+            line += self.data[pos:stop].count(b'\n')
+            pos = stop
+
+    def words(self, start: int = 0, end: Optional[int] = None,
+              first_line: int = 0) -> Iterator[Tuple[int, str]]:
+        """Yield (line number, word) for the non-empty lines in [start, end),
+        which must begin at the start of line first_line."""
+        for line, lo, hi in self.chunks(start, end, first_line, BLOCK):
+            for raw in self.data[lo:hi].split(b'\n'):
+                word = raw.strip()
+                if word:
+                    yield line, word.decode('utf-8', errors='surrogateescape')
+                line += 1
+
+
+def _decompressed_copy(path: str, tmp_dir: Optional[str] = None) -> str:
+    fd, copy = tempfile.mkstemp(prefix="words_", suffix=".txt", dir=tmp_dir)
+    try:
+        with open_reader(path) as source, os.fdopen(fd, 'wb') as target:
+            shutil.copyfileobj(source, target, BLOCK)
+    except BaseException:
+        os.remove(copy)
+        raise
+    return copy
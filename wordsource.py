@@ -0,0 +1,144 @@
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+DEFAULT_TTL = 7 * 24 * 3600
+# Seconds a failed fetch is remembered before the URL is tried again
+FAILURE_TTL = 3600
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "passmaster", "words")
+
+
+def parse_words(payload) -> List[str]:
+    """Extract a flat list of words from an API response body."""
+    words = []
+    if isinstance(payload, list):
+        for item in payload:
+            if isinstance(item, str):
+                word = item.strip()
+            elif isinstance(item, dict) and isinstance(item.get("word"), str):
+                word = item["word"].strip()
+            else:
+                continue
+            if word:
+                words.append(word)
+    return words
+
+
+class WordSource:
+    """Word lists fetched from HTTP APIs with an on-disk cache.
+
+    A cached list is used as long as it is younger than ttl seconds. In offline
+    mode the network is never touched: a cached list of any age is used, and
+    the fallback words otherwise. A failed or empty fetch also falls back to
+    the cache (if any) and then to the fallback words, so lookups never block
+    for longer than timeout. The failure is remembered for failure_ttl
+    seconds, during which the URL is not tried again (unless refreshing).
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, ttl: float = DEFAULT_TTL,
+                 offline: bool = False, refresh: bool = False, timeout: float = 10,
+                 failure_ttl: float = FAILURE_TTL):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.offline = offline
+        self.refresh = refresh
+        self.timeout = timeout
+
+    def cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def load_cache(self, key: str) -> Tuple[Optional[List[str]], float]:
+        """Return (words, age in seconds) for a cached list, or (None, inf)."""
+        try:
+            with open(self.cache_path(key), encoding="utf-8") as f:
+                data = json.load(f)
+            return parse_words(data["words"]), time.time() - data["fetched"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, float("inf")
+
+    def save_cache(self, key: str, url: str, words: List[str]):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{key}.", dir=self.cache_dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "fetched": time.time(), "words": words}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path(key))
+
+    def failure_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.failed.json")
+
+    def recently_failed(self, key: str, url: str) -> bool:
+        """Whether fetching url for key failed less than failure_ttl seconds ago."""
+        try:
+            with open(self.failure_path(key), encoding="utf-8") as f:
+                data = json.load(f)
+            return data["url"] == url and time.time() - data["failed"] < self.failure_ttl
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+    def save_failure(self, key: str, url: str):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self.failure_path(key), "w", encoding="utf-8") as f:
+                json.dump({"url": url, "failed": time.time()}, f)
+        except OSError:
+            pass
+
+    def fetch(self, url: str) -> List[str]:
+        response = requests.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return parse_words(response.json())
+
+    def get(self, key: str, url: Optional[str], fallback: List[str]) -> List[str]:
+        """Words for key, from cache, network or fallback in that order of preference."""
+        cached, age = self.load_cache(key)
+        if cached and (self.offline or not url or (not self.refresh and age < self.ttl)):
+            return cached
+
+        if url and not self.offline and (self.refresh or not self.recently_failed(key, url)):
+            try:
+                words = self.fetch(url)
+                if words:
+                    self.save_cache(key, url, words)
+                    return words
+                self.save_failure(key, url)
+            except (requests.RequestException, ValueError) as e:
+                self.save_failure(key, url)
+                print(f"Fetching {key} words failed ({e.__class__.__name__}), "
+                      f"using {'cached' if cached else 'fallback'} words", file=sys.stderr)
+
+        return cached or list(fallback)
+
+    def prefetch(self, sources: Dict[str, Tuple[Optional[str], List[str]]],
+                 workers: int = 8) -> Dict[str, List[str]]:
+        """Fetch several sources concurrently; sources maps key -> (url, fallback)."""
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {key: executor.submit(self.get, key, url, fallback)
+                       for key, (url, fallback) in sources.items()}
+            return {key: future.result() for key, future in futures.items()}
+
+
+def add_source_arguments(parser):
+    """Register the word cache options shared by the generators."""
+    parser.add_argument("--offline", action="store_true",
+                        help="Never fetch words from the network; use cached or built-in words")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Refetch word lists even if the cache is still fresh")
+    parser.add_argument("--cache-dir", help=f"Word cache directory (default: {default_cache_dir()})")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL / 3600,
+                        help="Hours before cached word lists are refetched (default: 168)")
+
+
+def source_from_args(args) -> WordSource:
+    return WordSource(cache_dir=args.cache_dir, ttl=args.cache_ttl * 3600,
+                      offline=args.offline, refresh=args.refresh)
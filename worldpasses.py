@@ -1,213 +1,941 @@
 import random
 import string
-import requests
 import argparse
+import json
+import sys
+import time
+from collections import Counter
+from functools import partial
+from itertools import chain, islice, permutations, product
+from estimate import Estimate, expected_draws, format_report
+from dedupe import make_dedupe
+from keyspace import MaskUnion
+from output import LineWriter, add_output_arguments, handle_broken_pipe, output_format_from_args
+from partition import Partition, add_partition_arguments, partition_from_args
+from policy import add_policy_arguments, classes_of, policy_from_args
+from rank import add_rank_arguments, ranker_from_args
+from stats import add_stats_arguments, stats_from_args
+from wordsource import WordSource, add_source_arguments, source_from_args
 
-def get_random_words(lang='en', count=1000):
-    """Get random words based on language (using latin characters)"""
-    
-    # API endpoints and fallback words for different languages
-    lang_data = {
-        'en': {
-            'api': "https://random-word-api.herokuapp.com/word?number=1000",
-            'fallback': [
-                'password', 'secret', 'secure', 'admin', 'login', 'welcome', 'user', 'access', 
-                '12345', 'qwerty', 'default', 'root', 'letmein', 'security', 'account', 'code', 
-                'session', 'password123', 'john', 'michael', 'sarah', 'emma'
-            ]
-        },
-        'es': {
-            'api': "https://api.dictionaryapi.dev/api/v2/entries/es/",
-            'fallback': [
-                'contrasena', 'secreto', 'seguro', 'administrador', 'bienvenido', 'entrada', 
-                'clave', 'usuario', 'acceso', '123456', 'admin', 'root', 'contraseña', 'codigo', 
-                'sesion', 'cuenta', 'seguridad', 'clave123', 'juan', 'maria', 'pedro', 'luis'
-            ]
-        },
-        'da': {
-            'api': "https://api.dictionaryapi.dev/api/v2/entries/da/",
-            'fallback': [
-                'adgangskode', 'sikkerhed', 'administrator', 'velkommen', 'hemmelighed', 'bruger', 
-                'kodeord', 'adgang', '12345', 'root', 'passord', 'login', 'kode', 'konto', 'session', 
-                'sikker', 'hemmelig', 'login123', 'karl', 'anne', 'lars', 'mette'
-            ]
-        },
-        'fi': {
-            'api': "https://api.dictionaryapi.dev/api/v2/entries/fi/",
-            'fallback': [
-                'salasana', 'turvallisuus', 'yllapitaja', 'tervetuloa', 'kayttaja', 'hallinta', 
-                'kirjaudu', 'avoin', '12345', 'admin', 'pääsy', 'salasanasana', 'tili', 'koodi', 
-                'istunto', 'suojaus', 'password123', 'kirjautuminen', 'mikko', 'anna', 'jussi', 'kati'
-            ]
-        },
-        'no': {
-            'api': "https://api.dictionaryapi.dev/api/v2/entries/no/",
-            'fallback': [
-                'passord', 'sikkerhet', 'administrator', 'velkommen', 'bruker', 'innlogging', 
-                'hemmelighet', '123456', 'admin', 'login', 'root', 'hemmelig', 'konto', 'passord123', 
-                'tilgang', 'sesjon', 'kode', 'sikker', 'olav', 'ingrid', 'hans', 'marit'
-            ]
-        },
-        'fr': {
-            'api': "https://api.dictionaryapi.dev/api/v2/entries/fr/",
-            'fallback': [
-                'motdepasse', 'bonjour', 'securite', 'administrateur', 'bienvenue', 'secret', 
-                'utilisateur', 'acces', '12345', 'root', 'connexion', 'letmein', 'code', 'compte', 
-                'session', 'securiser', 'motdepasse123', 'login', 'jean', 'marie', 'paul', 'lucie'
-            ]
-        },
-        'ru': {
-            'api': "https://api.dictionaryapi.dev/api/v2/entries/ru/",
-            'fallback': [
-                'parol', 'sekretniy', 'bezopasnost', 'admin', 'vhod', 'privet', 'dostup', '12345', 
-                'root', 'login', 'password', 'user', 'kodus', 'sekuriti', 'akkkount', 'session', 
-                'parol123', 'vhod123', 'alexei', 'olga', 'ivan', 'anna'
-            ]
-        },
-        'cn': {
-            'api': None,
-            'fallback': [
-                'mima', 'anquan', 'guanliyuan', 'denglu', 'nihao', 'huanying', 'yonghu', 'zhanghu', 
-                'shouji', 'youxiang', 'wenben', 'shujuku', 'wangluo', 'ruanjian', 'yingjian', 'xitong', 
-                'zhuce', 'tuichu', 'kaishi', 'jieshu', 'bangzhu', 'shezhi', 'geren', 'gongsi', 'xuexiao', 
-                'laoshi', 'xuesheng', 'pengyou', 'jiating', 'gonggong', 'beijing', 'shanghai', 'xianggang', 
-                'taiwan', 'zhongguo', 'meiguo', 'yingyu', 'hanyu', 'riyu', 'xiandai', 'gudai', 'weilai'
-            ]
-        },
-        'ng': {
-            'api': None,
-            'fallback': [
-                'asina', 'asiri', 'alaase', 'wole', 'ekabo', 'aabo', 'oluko', 'akeko', 'ile', 'omo', 
-                'baba', 'iya', 'olorun', 'eniyan', 'alafia', 'owuro', 'ale', 'osan', 'ojo', 'osu', 'odun', 
-                'opolopo', 'kere', 'tobi', 'dara', 'buru', 'gbogbo', 'okan', 'meji', 'meta', 'iwe', 'ise', 
-                'owo', 'ile', 'oko', 'oja', 'lagos', 'ibadan', 'ife', 'abeokuta', 'osun', 'oyo', 'yoruba', 
-                'hausa', 'igbo', 'nigeria', 'afrika', 'duniya'
-            ]
-        }
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SPECIAL_CHARS = "!$@#*^()%&"
+
+class _NullLog:
+    """Write-only stream that discards everything, for quiet runs"""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+NULL_LOG = _NullLog()
+
+# Shapes of the purely random patterns, for the vectorized backend. Each shape is
+# a list of (charset, length) segments; a pattern draws uniformly among its shapes,
+# matching the length and order choices made by the python loops.
+_ALL_CHARS = string.ascii_letters + string.digits + SPECIAL_CHARS
+RANDOM_SHAPES = {
+    0: [[(_ALL_CHARS, n)] for n in range(8, 16)],
+    2: [[(string.ascii_letters, 3), (string.digits, 3), (SPECIAL_CHARS, 3)]],
+    3: [list(order)
+        for a, b, c in product(range(3, 6), range(2, 5), range(2, 4))
+        for order in permutations([(string.ascii_letters, a), (string.digits, b), (SPECIAL_CHARS, c)])],
+    5: [[(string.ascii_letters, a), (string.digits, b), (SPECIAL_CHARS, c)]
+        for a, b, c in product(range(4, 7), range(2, 5), range(2, 4))],
+}
+
+# API endpoints and fallback words for different languages. Only English has a
+# random word API; the others use their built-in words
+LANG_DATA = {
+    'en': {
+        'api': "https://random-word-api.herokuapp.com/word?number=1000",
+        'fallback': [
+            'password', 'secret', 'secure', 'admin', 'login', 'welcome', 'user', 'access', 
+            '12345', 'qwerty', 'default', 'root', 'letmein', 'security', 'account', 'code', 
+            'session', 'password123', 'john', 'michael', 'sarah', 'emma'
+        ]
+    },
+    'es': {
+        'api': None,
+        'fallback': [
+            'contrasena', 'secreto', 'seguro', 'administrador', 'bienvenido', 'entrada', 
+            'clave', 'usuario', 'acceso', '123456', 'admin', 'root', 'contraseña', 'codigo', 
+            'sesion', 'cuenta', 'seguridad', 'clave123', 'juan', 'maria', 'pedro', 'luis'
+        ]
+    },
+    'da': {
+        'api': None,
+        'fallback': [
+            'adgangskode', 'sikkerhed', 'administrator', 'velkommen', 'hemmelighed', 'bruger', 
+            'kodeord', 'adgang', '12345', 'root', 'passord', 'login', 'kode', 'konto', 'session', 
+            'sikker', 'hemmelig', 'login123', 'karl', 'anne', 'lars', 'mette'
+        ]
+    },
+    'fi': {
+        'api': None,
+        'fallback': [
+            'salasana', 'turvallisuus', 'yllapitaja', 'tervetuloa', 'kayttaja', 'hallinta', 
+            'kirjaudu', 'avoin', '12345', 'admin', 'pääsy', 'salasanasana', 'tili', 'koodi', 
+            'istunto', 'suojaus', 'password123', 'kirjautuminen', 'mikko', 'anna', 'jussi', 'kati'
+        ]
+    },
+    'no': {
+        'api': None,
+        'fallback': [
+            'passord', 'sikkerhet', 'administrator', 'velkommen', 'bruker', 'innlogging', 
+            'hemmelighet', '123456', 'admin', 'login', 'root', 'hemmelig', 'konto', 'passord123', 
+            'tilgang', 'sesjon', 'kode', 'sikker', 'olav', 'ingrid', 'hans', 'marit'
+        ]
+    },
+    'fr': {
+        'api': None,
+        'fallback': [
+            'motdepasse', 'bonjour', 'securite', 'administrateur', 'bienvenue', 'secret', 
+            'utilisateur', 'acces', '12345', 'root', 'connexion', 'letmein', 'code', 'compte', 
+            'session', 'securiser', 'motdepasse123', 'login', 'jean', 'marie', 'paul', 'lucie'
+        ]
+    },
+    'ru': {
+        'api': None,
+        'fallback': [
+            'parol', 'sekretniy', 'bezopasnost', 'admin', 'vhod', 'privet', 'dostup', '12345', 
+            'root', 'login', 'password', 'user', 'kodus', 'sekuriti', 'akkkount', 'session', 
+            'parol123', 'vhod123', 'alexei', 'olga', 'ivan', 'anna'
+        ]
+    },
+    'cn': {
+        'api': None,
+        'fallback': [
+            'mima', 'anquan', 'guanliyuan', 'denglu', 'nihao', 'huanying', 'yonghu', 'zhanghu', 
+            'shouji', 'youxiang', 'wenben', 'shujuku', 'wangluo', 'ruanjian', 'yingjian', 'xitong', 
+            'zhuce', 'tuichu', 'kaishi', 'jieshu', 'bangzhu', 'shezhi', 'geren', 'gongsi', 'xuexiao', 
+            'laoshi', 'xuesheng', 'pengyou', 'jiating', 'gonggong', 'beijing', 'shanghai', 'xianggang', 
+            'taiwan', 'zhongguo', 'meiguo', 'yingyu', 'hanyu', 'riyu', 'xiandai', 'gudai', 'weilai'
+        ]
+    },
+    'ng': {
+        'api': None,
+        'fallback': [
+            'asina', 'asiri', 'alaase', 'wole', 'ekabo', 'aabo', 'oluko', 'akeko', 'ile', 'omo', 
+            'baba', 'iya', 'olorun', 'eniyan', 'alafia', 'owuro', 'ale', 'osan', 'ojo', 'osu', 'odun', 
+            'opolopo', 'kere', 'tobi', 'dara', 'buru', 'gbogbo', 'okan', 'meji', 'meta', 'iwe', 'ise', 
+            'owo', 'ile', 'oko', 'oja', 'lagos', 'ibadan', 'ife', 'abeokuta', 'osun', 'oyo', 'yoruba', 
+            'hausa', 'igbo', 'nigeria', 'afrika', 'duniya'
+        ]
     }
+}
 
-    if lang not in lang_data:
-        print(f"Unsupported language {lang}, using English")
+def get_random_words(lang='en', count=1000, source=None):
+    """Get random words based on language (using latin characters)"""
+    if lang not in LANG_DATA:
+        print(f"Unsupported language {lang}, using English", file=sys.stderr)
         lang = 'en'
     
-    word_list = []
-    
-    # Try API if available
-    if lang_data[lang]['api']:
-        try:
-            response = requests.get(lang_data[lang]['api'])
-            if response.status_code == 200:
-                word_list = response.json()
-        except:
-            print(f"API failed for {lang}, using fallback words")
-    
-    # Use fallback if no words or no API
-    if not word_list:
-        word_list = lang_data[lang]['fallback']
-    
-    return word_list
+    source = source or WordSource()
+    return source.get(f"world_{lang}", LANG_DATA[lang]['api'], LANG_DATA[lang]['fallback'])
 
-def generate_passwords(lang='en'):
-    special_chars = "!$@#*^()%&"
-    words = get_random_words(lang)
-    passwords = set()
-    
-    print(f"Generating 400,000 passwords using {lang} words...")
-    
-    # NEW: Pattern 0: Totally Random (50k)
-    while len(passwords) < 50000:
+def prefetch_words(source=None):
+    """Fetch and cache the word lists for every language concurrently"""
+    source = source or WordSource()
+    return source.prefetch({f"world_{lang}": (data['api'], data['fallback'])
+                            for lang, data in LANG_DATA.items()})
+
+# Structured patterns as exact keyspaces. Pattern 1 draws its number uniformly
+# from 100000..999999999, i.e. a non-zero digit followed by 5-8 more digits.
+STRUCTURED_SHAPES = dict(RANDOM_SHAPES)
+STRUCTURED_SHAPES[1] = [[("123456789", 1), (string.digits, d - 1), (SPECIAL_CHARS, k)]
+                        for d in range(6, 10) for k in range(2, 5)]
+_KEYSPACES = {}
+
+def pattern_keyspace(pattern, policy=None):
+    """Exact, randomly addressable keyspace of a structured pattern, restricted
+    to the shapes and characters a policy allows"""
+    key = (pattern, str(policy))
+    if key not in _KEYSPACES:
+        shapes = STRUCTURED_SHAPES[pattern]
+        if policy is not None:
+            shapes = policy.compile_shapes(shapes)
+        _KEYSPACES[key] = MaskUnion.from_shapes(shapes)
+    return _KEYSPACES[key]
+
+def enumerated_before(pwd, enumerated):
+    """True if pwd lies in an index range already written from another keyspace"""
+    for keyspace, count in enumerated:
+        rank = keyspace.index_of(pwd)
+        if rank is not None and rank < count:
+            return True
+    return False
+
+def _years(first, last):
+    return [str(year) for year in range(first, last + 1)]
+
+# Word pattern shapes: each part is 'word', 'title' (a title-cased word) or
+# (choices, k), k independent picks from choices (a charset or list of strings
+# of one length). Two word parts take a pair of words.
+WORD_SHAPES = {
+    4: [['word', (_years(1990, 2024), 1), (SPECIAL_CHARS, 1)],
+        ['word', (SPECIAL_CHARS, 1), (string.digits, 3)],
+        ['title', (SPECIAL_CHARS, 1), (_years(2020, 2024), 1)],
+        ['word', (string.digits, 2), 'word']],
+    6: [['word', (SPECIAL_CHARS, 1), (_years(2010, 2024), 1)]],
+    7: [['word', 'word', (string.digits, 3), (SPECIAL_CHARS, 1)]],
+}
+
+def _allowed_choices(policy, choices):
+    """choices without the values containing characters the policy bans"""
+    if isinstance(choices, str):
+        return policy.allowed_chars(choices)
+    return [choice for choice in choices if policy.allowed_chars(choice) == choice]
+
+class WordIndex:
+    """Distinct words bucketed by length, so word patterns only sample
+    combinations whose total length fits the password length window.
+
+    The WORD_SHAPES of each word pattern are compiled against the policy up
+    front (see compile_shapes), so shapes that can never meet it are not
+    sampled and capacity() counts only what the policy allows."""
+
+    def __init__(self, words, min_length=8, max_length=15, policy=None):
+        words = dict.fromkeys(words)
+        if policy is not None:
+            words = [word for word in words if policy.allowed_chars(word) == word]
+        self.words = list(words)
+        self.min_length = min_length
+        self.max_length = max_length
+        self.classes = classes_of(''.join(self.words))
+        self.by_length = {}
+        for word in self.words:
+            self.by_length.setdefault(len(word), []).append(word)
+        self.shapes = {pattern: self.compile_shapes(shapes, policy)
+                       for pattern, shapes in WORD_SHAPES.items()}
+
+    def fitting(self, extra):
+        """Words that fit the window once extra characters are added"""
+        return [word for length, words in self.by_length.items()
+                if self.min_length <= length + extra <= self.max_length
+                for word in words]
+
+    def pair_buckets(self, extra):
+        """Length-bucket pairs whose words fit the window together with extra
+        characters, as (bucket pairs, cumulative pair counts)"""
+        pairs, cum_weights, total = [], [], 0
+        for a, first in self.by_length.items():
+            for b, second in self.by_length.items():
+                if self.min_length <= a + b + extra <= self.max_length:
+                    total += len(first) * len(second)
+                    pairs.append((first, second))
+                    cum_weights.append(total)
+        return pairs, cum_weights
+
+    def choose_pair(self, buckets):
+        """Uniformly random (word1, word2) from the output of pair_buckets"""
+        pairs, cum_weights = buckets
+        first, second = random.choices(pairs, cum_weights=cum_weights)[0]
+        return random.choice(first), random.choice(second)
+
+    def compile_shapes(self, shapes, policy=None):
+        """Word shapes as (parts, words, count) for sampling: banned characters
+        removed from the choices, words that fit the length window with the
+        other parts (a list, or pair buckets for two-word shapes) and the number
+        of distinct passwords the shape can build. With a policy, words that
+        cannot meet it are left out and shapes left with nothing are dropped."""
+        compiled = []
+        for shape in shapes:
+            parts = [part if isinstance(part, str) else
+                     (part[0] if policy is None else _allowed_choices(policy, part[0]), part[1])
+                     for part in shape]
+            choices = [part for part in parts if not isinstance(part, str)]
+            if any(not values for values, _ in choices):
+                continue
+            extra = sum(len(values[0]) * k for values, k in choices)
+            added = classes_of(''.join(''.join(values) for values, _ in choices))
+            combinations = 1
+            for values, k in choices:
+                combinations *= len(values) ** k
+            if parts.count('word') == 2:
+                if policy is not None and not policy.possible(self.classes | added):
+                    continue
+                words = self.pair_buckets(extra)
+                count = words[1][-1] if words[1] else 0
+            else:
+                title = 'title' in parts
+                words = self.fitting(extra)
+                if policy is not None:
+                    words = [word for word in words
+                             if policy.possible(classes_of(word.title() if title else word)
+                                                | added)]
+                count = len(words)
+            if policy is not None and not count:
+                continue
+            compiled.append((parts, words, count * combinations))
+        return compiled
+
+    def capacity(self):
+        """Upper bound on distinct passwords each word pattern can produce"""
+        return {pattern: sum(count for _, _, count in shapes)
+                for pattern, shapes in self.shapes.items()}
+
+    def feasible(self):
+        """Whether each word pattern has a shape that can meet the policy"""
+        return {pattern: bool(shapes) for pattern, shapes in self.shapes.items()}
+
+def check_quotas(quotas, capacity, index, policy=None):
+    """Raise ValueError if a pattern cannot produce its quota"""
+    for pattern, quota in quotas.items():
+        if pattern in capacity and quota > capacity[pattern]:
+            source = f" from {len(index.words)} words" if pattern in WORD_SHAPES else ""
+            rules = " under the policy" if policy is not None else ""
+            raise ValueError(f"pattern {pattern} can produce at most {capacity[pattern]:,} "
+                             f"passwords{source}{rules}, but its quota is {quota:,}")
+
+def vectorized_batch(shapes, count, rng):
+    """Draw count passwords with numpy, spread uniformly over the given shapes"""
+    passwords = []
+    for shape, n in zip(shapes, rng.multinomial(count, [1 / len(shapes)] * len(shapes))):
+        if not n:
+            continue
+        columns = []
+        for charset, length in shape:
+            chars = np.frombuffer(charset.encode('ascii'), dtype=np.uint8)
+            columns.append(chars[rng.integers(0, len(chars), size=(n, length))])
+        block = np.ascontiguousarray(np.concatenate(columns, axis=1))
+        width = block.shape[1]
+        passwords.extend(block.view(f'S{width}').ravel().astype(f'U{width}').tolist())
+    return passwords
+
+def random_pattern(pattern, rng, shapes=None):
+    """Endless vectorized candidates for one of the RANDOM_SHAPES patterns"""
+    shapes = shapes or RANDOM_SHAPES[pattern]
+    while True:
+        yield from vectorized_batch(shapes, 1 << 16, rng)
+
+def shape_pattern(shapes):
+    """Endless candidates drawn uniformly over (charset, length) shapes"""
+    while True:
+        shape = random.choice(shapes)
+        yield ''.join(''.join(random.choices(charset, k=length)) for charset, length in shape)
+
+def shard_shapes(shapes, partition):
+    """This shard's slice of each (charset, length) shape, for sampling.
+
+    A shape's keyspace is ordered like an odometer (see Mask), so a range of
+    values of its leading positions is a contiguous range of its keyspace.
+    Shards split those prefix values contiguously, so their samples never
+    overlap and none are drawn only to be discarded. Returns (charsets,
+    split, (lo, hi), size) per shape: the charset of every position, how
+    many leading positions form the prefix, the prefix range and the number
+    of candidates in the slice; shapes with an empty slice are left out."""
+    sliced = []
+    for shape in shapes:
+        charsets = [charset for charset, length in shape for _ in range(length)]
+        split, prefixes = 0, 1
+        while split < len(charsets) and prefixes < SHARD_PREFIXES:
+            prefixes *= len(charsets[split])
+            split += 1
+        lo, hi = Partition(index=partition.index, count=partition.count).range(prefixes)
+        if lo < hi:
+            size = hi - lo
+            for charset in charsets[split:]:
+                size *= len(charset)
+            sliced.append((charsets, split, (lo, hi), size))
+    return sliced
+
+def sliced_pattern(sliced, rng=None):
+    """Endless candidates drawn uniformly over the shapes of shard_shapes and
+    uniformly within each shape's slice, vectorized with an rng"""
+    if rng is None:
+        while True:
+            charsets, split, (lo, hi), _ = random.choice(sliced)
+            prefix = random.randrange(lo, hi)
+            head = []
+            for charset in reversed(charsets[:split]):
+                prefix, digit = divmod(prefix, len(charset))
+                head.append(charset[digit])
+            yield ''.join(reversed(head)) + ''.join(random.choice(charset)
+                                                    for charset in charsets[split:])
+    while True:
+        passwords = []
+        counts = rng.multinomial(1 << 16, [1 / len(sliced)] * len(sliced))
+        for (charsets, split, (lo, hi), _), n in zip(sliced, counts):
+            if not n:
+                continue
+            prefix = rng.integers(lo, hi, size=n)
+            columns = [None] * len(charsets)
+            for pos in range(split - 1, -1, -1):
+                prefix, digit = np.divmod(prefix, len(charsets[pos]))
+                columns[pos] = digit
+            for pos in range(split, len(charsets)):
+                columns[pos] = rng.integers(0, len(charsets[pos]), size=n)
+            block = np.stack([np.frombuffer(charset.encode('ascii'), dtype=np.uint8)[digits]
+                              for charset, digits in zip(charsets, columns)], axis=1)
+            width = block.shape[1]
+            passwords.extend(block.view(f'S{width}').ravel().astype(f'U{width}').tolist())
+        yield from passwords
+
+def pattern_0(index):
+    # NEW: Pattern 0: Totally Random
+    all_chars = string.ascii_letters + string.digits + SPECIAL_CHARS
+    while True:
         length = random.randint(8, 15)
-        all_chars = string.ascii_letters + string.digits + special_chars
-        pwd = ''.join(random.choice(all_chars) for _ in range(length))
-        passwords.add(pwd)
-    
-    # Pattern 1: Numbers with special chars (50k)
-    while len(passwords) < 100000:
+        yield ''.join(random.choice(all_chars) for _ in range(length))
+
+def pattern_1(index):
+    # Pattern 1: Numbers with special chars
+    special_chars = SPECIAL_CHARS
+    while True:
         num = random.randint(100000, 999999999)
         chars = ''.join(random.choices(special_chars, k=random.randint(2,4)))
         pwd = f"{num}{chars}"
         if 8 <= len(pwd) <= 15:
-            passwords.add(pwd)
-    
-    # Pattern 2: 3 letters + 3 numbers + 3 special chars (50k)
-    while len(passwords) < 150000:
+            yield pwd
+
+def pattern_2(index):
+    # Pattern 2: 3 letters + 3 numbers + 3 special chars
+    special_chars = SPECIAL_CHARS
+    while True:
         letters = ''.join(random.choices(string.ascii_letters, k=3))
         numbers = ''.join(random.choices(string.digits, k=3))
         chars = ''.join(random.choices(special_chars, k=3))
-        pwd = f"{letters}{numbers}{chars}"
-        passwords.add(pwd)
-    
-    # Pattern 3: Semi-structured mix (50k)
-    while len(passwords) < 200000:
-        length = random.randint(8, 15)
+        yield f"{letters}{numbers}{chars}"
+
+def pattern_3(index):
+    # Pattern 3: Semi-structured mix
+    special_chars = SPECIAL_CHARS
+    while True:
         parts = [
             ''.join(random.choices(string.ascii_letters, k=random.randint(3,5))),
             ''.join(random.choices(string.digits, k=random.randint(2,4))),
             ''.join(random.choices(special_chars, k=random.randint(2,3)))
         ]
         random.shuffle(parts)
-        pwd = ''.join(parts)
-        passwords.add(pwd)
-    
-    # Pattern 4: Word-based passwords (50k)
-    while len(passwords) < 250000:
-        word = random.choice(words)
-        pattern = random.choice([
-            lambda: word + str(random.randint(1990,2024)) + random.choice(special_chars),
-            lambda: word + random.choice(special_chars) + ''.join(random.choices(string.digits, k=3)),
-            lambda: word.title() + random.choice(special_chars) + str(random.randint(2020,2024)),
-            lambda: word + ''.join(random.choices(string.digits, k=2)) + random.choice(words)
-        ])
-        pwd = pattern()
-        if 8 <= len(pwd) <= 15:
-            passwords.add(pwd)
-    # Pattern 5: Mixed case with special chars and numbers (50k)
-    while len(passwords) < 300000:
+        yield ''.join(parts)
+
+def word_pattern(index, shapes):
+    """Endless candidates of compiled word shapes (see WordIndex.compile_shapes).
+    Each shape is weighted by the share of word choices that fit it, which
+    matches picking words and a shape at random and rejecting misfits, minus
+    the misses."""
+    n = len(index.words) or 1
+    builders, weights = [], []
+    for parts, words, _ in shapes:
+        pair = isinstance(words, tuple)
+        weights.append((words[1][-1] if words[1] else 0) / n ** 2 if pair else len(words) / n)
+        builders.append(_shape_builder(index, parts, words, pair))
+    if not any(weights):
+        return
+    if len(builders) == 1:
+        build = builders[0]
+        while True:
+            yield build()
+    while True:
+        yield random.choices(builders, weights=weights)[0]()
+
+def _part_picker(part, words):
+    if part == 'word':
+        return partial(random.choice, words)
+    if part == 'title':
+        return lambda: random.choice(words).title()
+    values, k = part
+    if k == 1:
+        return partial(random.choice, values)
+    return lambda: ''.join(random.choices(values, k=k))
+
+def _shape_builder(index, parts, words, pair):
+    """Function building one password of a compiled word shape"""
+    if not pair:
+        pickers = [_part_picker(part, words) for part in parts]
+        return lambda: ''.join([pick() for pick in pickers])
+    # Both words come from one pair draw; None marks where they go
+    pickers = [None if part == 'word' else _part_picker(part, None) for part in parts]
+
+    def build():
+        pair_words = iter(index.choose_pair(words))
+        return ''.join([next(pair_words) if pick is None else pick() for pick in pickers])
+    return build
+
+def pattern_4(index):
+    # Pattern 4: Word-based passwords: word + year + special, word + special +
+    # 3 digits, Word + special + 2020-2024 or word + 2 digits + word
+    return word_pattern(index, index.shapes[4])
+
+def pattern_5(index):
+    # Pattern 5: Mixed case with special chars and numbers
+    special_chars = SPECIAL_CHARS
+    while True:
         letters = ''.join(random.choices(string.ascii_letters, k=random.randint(4,6)))
         numbers = ''.join(random.choices(string.digits, k=random.randint(2,4)))
         chars = ''.join(random.choices(special_chars, k=random.randint(2,3)))
-        pwd = f"{letters}{numbers}{chars}"
-        passwords.add(pwd)
-    
-    # Pattern 6: Word + Random Special Char + Year (50k)
-    while len(passwords) < 350000:
-        word = random.choice(words)
-        year = random.randint(2010, 2024)
-        chars = random.choice(special_chars)
-        pwd = f"{word}{chars}{year}"
-        if 8 <= len(pwd) <= 15:
-            passwords.add(pwd)
+        yield f"{letters}{numbers}{chars}"
 
-  
-    # NEW: Pattern 7: 2 words + 3 numbers + special char (50k)
-    while len(passwords) < 400000:
-        word1 = random.choice(words)
-        word2 = random.choice(words)
-        numbers = ''.join(random.choices(string.digits, k=3))
-        special_char = random.choice(special_chars)
-        pwd = f"{word1}{word2}{numbers}{special_char}"
-        if 8 <= len(pwd) <= 15:
-            passwords.add(pwd)
+def pattern_6(index):
+    # Pattern 6: Word + Random Special Char + Year
+    return word_pattern(index, index.shapes[6])
+
+def pattern_7(index):
+    # NEW: Pattern 7: 2 words + 3 numbers + special char
+    return word_pattern(index, index.shapes[7])
+
+PATTERNS = {0: pattern_0, 1: pattern_1, 2: pattern_2, 3: pattern_3,
+            4: pattern_4, 5: pattern_5, 6: pattern_6, 7: pattern_7}
+DEFAULT_QUOTA = 50000
+# Consecutive rejected candidates after which a sampled pattern counts as exhausted
+MAX_MISSES = 250000
+# Sampled candidates filtered and deduplicated together
+DRAW_BATCH = 8192
+# Fewest prefixes a sharded shape is split on, so shard slices differ by < 0.01%
+SHARD_PREFIXES = 1 << 16
+
+def default_quotas(total=None):
+    """Per-pattern quotas: 50k each, or total split evenly across patterns"""
+    if total is None:
+        return dict.fromkeys(PATTERNS, DEFAULT_QUOTA)
+    share, extra = divmod(total, len(PATTERNS))
+    return {pattern: share + (pattern < extra) for pattern in PATTERNS}
+
+def pattern_slots(quotas, partition):
+    """Map each pattern to the (lo, hi) slots of its quota this node produces.
+
+    Every shard takes its share of each pattern's quota, so the shards of a
+    run together produce every quota exactly and see the same mix of
+    patterns. skip and limit then apply to the shard's own slots, numbered
+    pattern by pattern."""
+    shard = Partition(index=partition.index, count=partition.count)
+    shares = {pattern: shard.range(max(quota, 0)) for pattern, quota in quotas.items()}
+    within = Partition(skip=partition.skip, limit=partition.limit)
+    start, stop = within.range(sum(hi - lo for lo, hi in shares.values()))
+    slots, offset = {}, 0
+    for pattern, (lo, hi) in shares.items():
+        size = hi - lo
+        first = min(max(start - offset, 0), size)
+        last = max(min(stop - offset, size), first)
+        slots[pattern] = (lo + first, lo + last)
+        offset += size
+    return slots
 
+def iter_passwords(lang='en', source=None, backend='auto', quotas=None, dedupe='auto',
+                   dedupe_bytes=512 * 1024 * 1024, exhaustive=False, partition=None,
+                   policy=None, ranker=None, words=None, log=None, samples=None, stats=None):
+    """Lazily yield passwords for a language.
+
+    Passwords are yielded as they are generated, pattern by pattern, until each
+    pattern's quota of new passwords is met. Duplicates are filtered by a
+    CompactSet of 64-bit fingerprints while its table fits in dedupe_bytes, or
+    a Bloom filter of at most dedupe_bytes beyond that, so memory never grows
+    past the budget. backend 'numpy' (or 'auto' when numpy is installed)
+    draws the purely random patterns 0, 2, 3 and 5 in vectorized batches
+    instead of one at a time.
+
+    With exhaustive, the structured patterns 0, 1, 2, 3 and 5 enumerate the
+    first quota candidates of their keyspace in order instead of sampling.
+    Those need no dedupe memory: a candidate is skipped only if it falls in a
+    range already written from another pattern's keyspace.
+
+    A partition selects a slice of the run: each shard takes its share of
+    every pattern's quota, then skip/limit (see pattern_slots). Enumerated
+    patterns jump straight to the first index of their slice. Sampled
+    structured patterns draw only from this shard's slice of their keyspace
+    (see shard_shapes) and word patterns keep the candidates this shard owns
+    (see Partition.owns), so shards never overlap. Random draws have no
+    fixed order to slice, so skip/limit are refused while any pattern is
+    sampled.
+
+    A policy is compiled before anything is generated: banned characters are
+    removed from the pattern charsets, shapes outside its length window or
+    lacking a required character class are dropped, and patterns left with
+    nothing are skipped. What cannot be pruned is checked per candidate.
+
+    With a ranker, passwords are binned by model cost while they are generated
+    and yielded most likely first at the end.
+
+    words replaces the language's word list (any iterable). Progress goes to
+    the log stream if given, and the first few passwords are appended to
+    samples. With stats (a RunStats), each pattern's draws are counted and
+    timed per batch under "Pattern <n>".
+    """
+    if ranker is None:
+        yield from _iter_passwords(lang, source, backend, quotas, dedupe, dedupe_bytes,
+                                   exhaustive, partition, policy, words, log, samples, stats)
+        return
+    with ranker:
+        ranker.write_lines(_iter_passwords(lang, source, backend, quotas, dedupe, dedupe_bytes,
+                                           exhaustive, partition, policy, words, log, samples,
+                                           stats))
+        if log is not None:
+            print("Writing ranked passwords...", file=log)
+        yield from ranker.drain()
+
+def _iter_passwords(lang, source, backend, quotas, dedupe, dedupe_bytes, exhaustive,
+                    partition, policy, words, log, samples, stats):
+    log = log or NULL_LOG
+    clock = time.perf_counter
+    samples = [] if samples is None else samples
+    if backend == 'numpy' and np is None:
+        raise RuntimeError("numpy backend requested but numpy is not installed")
+    rng = np.random.default_rng() if np is not None and backend != 'python' else None
+    quotas = quotas or default_quotas()
+    partition = partition or Partition()
+    words = get_random_words(lang, source=source) if words is None else list(words)
+    feasible = dict.fromkeys(PATTERNS, True)
+    shapes = {}
+    if policy is None:
+        index = WordIndex(words)
+    else:
+        index = WordIndex(words, policy.min_length, policy.max_length, policy)
+        feasible.update(index.feasible())
+        for pattern, pattern_shapes in STRUCTURED_SHAPES.items():
+            compiled = policy.compile_shapes(pattern_shapes)
+            feasible[pattern] = bool(compiled)
+            if compiled != pattern_shapes:
+                shapes[pattern] = compiled
+    slots = pattern_slots(quotas, partition)
+    total = sum(hi - lo for lo, hi in slots.values())
+    sampled = [pattern for pattern, (lo, hi) in slots.items() if feasible[pattern] and lo < hi
+               and not (exhaustive and pattern in STRUCTURED_SHAPES)]
+    if sampled and (partition.skip or partition.limit is not None):
+        # Random draws differ from run to run, so slices of them would overlap
+        raise ValueError(f"skip and limit need a fixed order, but pattern(s) "
+                         f"{', '.join(map(str, sampled))} are sampled at random; shard the "
+                         f"run instead, or enumerate only the structured patterns")
+    sliced = {}
+    if partition.count > 1 and not exhaustive:
+        sliced = {pattern: shard_shapes(shapes.get(pattern, pattern_shapes), partition)
+                  for pattern, pattern_shapes in STRUCTURED_SHAPES.items() if feasible[pattern]}
+    capacity = index.capacity()
+    if not exhaustive:
+        # Sampling cannot find more distinct passwords than the keyspace holds
+        capacity.update({pattern: pattern_keyspace(pattern, policy).size
+                         for pattern in STRUCTURED_SHAPES if feasible[pattern]})
+        capacity.update({pattern: sum(size for *_, size in shard)
+                         for pattern, shard in sliced.items()})
+    # A shard keeps only the word pattern samples it owns, about 1/count of
+    # them, so its share needs as much room as the whole quota
+    check_quotas({pattern: quotas[pattern] if partition.count > 1 and pattern in WORD_SHAPES
+                  else hi - lo
+                  for pattern, (lo, hi) in slots.items() if feasible[pattern] and lo < hi},
+                 capacity, index, policy)
+    seen = make_dedupe(total, dedupe, dedupe_bytes)
+    
+    print(f"Generating {total:,} passwords using {lang} words...", file=log)
+    if not partition.is_whole:
+        print(f"Partition: {partition} ({total:,} of "
+              f"{sum(max(quota, 0) for quota in quotas.values()):,} slots)", file=log)
+    if policy is not None:
+        print(f"Policy: {policy}", file=log)
     
-    # Write to file
-    filename = f'world-passwords_{lang}.txt'
-    with open(filename, 'w') as f:
-        for password in passwords:
-            f.write(password + '\n')
+    enumerated = []
+    written = 0
+    for pattern, quota in quotas.items():
+        if quota <= 0:
+            continue
+        lo, hi = slots[pattern]
+        counters = None
+        if not feasible[pattern]:
+            if lo < hi:
+                print(f"Pattern {pattern}: skipped, no candidate can meet the policy", file=log)
+            continue
+        if exhaustive and pattern in STRUCTURED_SHAPES:
+            keyspace = pattern_keyspace(pattern, policy)
+            count = min(quota, keyspace.size)
+            hi = min(hi, count)
+            if lo < hi:
+                if stats is not None:
+                    counters = stats.stage(f"Pattern {pattern}")
+                candidates = keyspace.iter_range(lo, hi)
+                produced = 0
+                while True:
+                    started = clock()
+                    drawn = list(islice(candidates, DRAW_BATCH))
+                    if not drawn:
+                        break
+                    batch = drawn
+                    if policy is not None:
+                        batch = (policy.filter(batch) if counters is None
+                                 else counters.filter(policy, batch))
+                    allowed = len(batch)
+                    if enumerated:
+                        batch = [pwd for pwd in batch if not enumerated_before(pwd, enumerated)]
+                    if counters is not None:
+                        counters.seconds += clock() - started
+                        counters.generated += len(drawn)
+                        counters.duplicates += allowed - len(batch)
+                        counters.unique += len(batch)
+                        stats.sample(written + produced)
+                    yield from batch
+                    produced += len(batch)
+                written += produced
+                if len(samples) < 5:
+                    samples.append(keyspace.nth(hi - 1))
+                print(f"Pattern {pattern}: {produced:,} passwords "
+                      f"(indices {lo:,}-{hi - 1:,} of {keyspace.size:,})", file=log)
+            # Every shard skips the whole enumerated range, not just its own slice
+            enumerated.append((keyspace, count))
+            continue
+        if lo >= hi:
+            continue
+        quota = hi - lo
+        if stats is not None:
+            counters = stats.stage(f"Pattern {pattern}")
+
+        if pattern in sliced:
+            candidates = sliced_pattern(sliced[pattern], rng)
+        elif pattern in shapes:
+            candidates = (random_pattern(pattern, rng, shapes[pattern]) if rng is not None
+                          else shape_pattern(shapes[pattern]))
+        elif rng is not None and pattern in RANDOM_SHAPES:
+            candidates = random_pattern(pattern, rng)
+        else:
+            candidates = PATTERNS[pattern](index)
+
+        # Draw in batches no larger than what is still missing, so the filter
+        # only ever records passwords that are written
+        produced = misses = 0
+        candidates = iter(candidates)
+        while produced < quota:
+            started = clock()
+            drawn = list(islice(candidates, min(quota - produced, DRAW_BATCH)))
+            if counters is not None:
+                counters.seconds += clock() - started
+            if not drawn:
+                break
+            batch = drawn
+            if enumerated:
+                batch = [pwd for pwd in batch if not enumerated_before(pwd, enumerated)]
+            overlap = len(drawn) - len(batch)
+            if policy is not None:
+                batch = (policy.filter(batch) if counters is None
+                         else counters.filter(policy, batch))
+            allowed = len(batch)
+            if partition.count > 1 and pattern not in sliced:
+                batch = [pwd for pwd in batch if partition.owns(pwd)]
+            fresh = seen.add_many(batch)
+            if counters is not None:
+                counters.generated += len(drawn)
+                counters.skipped += allowed - len(batch)
+                counters.duplicates += overlap + len(batch) - len(fresh)
+                counters.unique += len(fresh)
+                stats.sample(written + produced + len(fresh))
+            if not fresh:
+                misses += len(drawn)
+                if misses >= MAX_MISSES:
+                    raise ValueError(f"pattern {pattern} stalled after {produced:,} of "
+                                     f"{quota:,} passwords; lower its quota or relax the policy")
+                continue
+            misses = 0
+            yield from fresh
+            produced += len(fresh)
+        if len(samples) < 5 and produced:
+            samples.append(fresh[-1])
+        written += produced
+        print(f"Pattern {pattern}: {produced:,} passwords", file=log)
+
+def generate_passwords(lang='en', output_file=None, quiet=False, source=None, backend='auto',
+                       quotas=None, dedupe='auto', dedupe_bytes=512 * 1024 * 1024,
+                       exhaustive=False, partition=None, policy=None, ranker=None, stats=None,
+                       output_format=None):
+    """Generate passwords for a language; output_file '-' writes to stdout.
+
+    See iter_passwords for how the passwords are produced. With stats, the
+    per-pattern report is printed after the samples. output_format
+    compresses or chunks the output (see OutputFormat).
+    """
+    filename = output_file or f'world-passwords_{lang}.txt'
+    log = NULL_LOG if quiet else (sys.stderr if filename == '-' else sys.stdout)
+    samples = []
+    passwords = iter_passwords(lang, source, backend, quotas, dedupe, dedupe_bytes, exhaustive,
+                               partition, policy, ranker, log=log, samples=samples, stats=stats)
+    # The quota checks run before the first password, so an impossible run
+    # fails without creating or truncating the output file
+    first = list(islice(passwords, 1))
+    with LineWriter(filename, output_format=output_format) as writer:
+        writer.write_lines(chain(first, passwords))
+    if stats is not None:
+        stats.finish(writer.count)
     
-    print(f"\nGenerated {len(passwords)} passwords and saved to {filename}")
-    print("\nSample passwords:")
-    for pwd in list(passwords)[:5]:
-        print(pwd)
+    print(f"\nGenerated {writer.count:,} passwords and saved to {writer.destination}", file=log)
+    print("\nSample passwords:", file=log)
+    for pwd in samples:
+        print(pwd, file=log)
+    if stats is not None:
+        print(f"\n{stats.format()}", file=log)
+
+def _length_stats(lengths, extra, min_len=8, max_len=15):
+    """Acceptance rate, number of accepted values and mean length of len + extra
+    for a histogram of base lengths (as produced by Counter)."""
+    total = sum(lengths.values())
+    ok = {n: c for n, c in lengths.items() if min_len <= n + extra <= max_len}
+    accepted = sum(ok.values())
+    mean = sum((n + extra) * c for n, c in ok.items()) / accepted if accepted else 0
+    return (accepted / total if total else 0), accepted, mean
+
+def _pair_lengths(lengths):
+    """Histogram of combined lengths for two independently chosen words."""
+    pairs = Counter()
+    for a, ca in lengths.items():
+        for b, cb in lengths.items():
+            pairs[a + b] += ca * cb
+    return pairs
+
+def estimate_passwords(lang='en', quotas=None, source=None):
+    """Estimate draws, dedupe ratio and output size for each pattern"""
+    special, digits = len(SPECIAL_CHARS), len(string.digits)
+    words = get_random_words(lang, source=source)
+    lengths = Counter(len(w) for w in set(words))
+    pairs = _pair_lengths(lengths)
+
+    # Pattern 1: 6-9 digit numbers from 100000..999999999 plus 2-4 specials
+    numbers = {d: 9 * 10 ** (d - 1) for d in range(6, 10)}
+    number_total = 999999999 - 100000 + 1
+    number_len = sum(d * c for d, c in numbers.items()) / number_total
+    keyspace = {pattern: pattern_keyspace(pattern).size for pattern in STRUCTURED_SHAPES}
+
+    # Pattern 4 picks one of four shapes at random
+    shapes = [
+        (_length_stats(lengths, 5), 35 * special),               # word + year + special
+        (_length_stats(lengths, 4), special * digits ** 3),      # word + special + 3 digits
+        (_length_stats(lengths, 5), special * 5),                # Word + special + 2020-2024
+        (_length_stats(pairs, 2), digits ** 2),                  # word + 2 digits + word
+    ]
+    p4_accept = sum(stats[0] for stats, _ in shapes) / len(shapes)
+    p4_space = sum(stats[1] * combos for stats, combos in shapes)
+    p4_len = (sum(stats[0] * stats[2] for stats, _ in shapes) / (p4_accept * len(shapes))
+              if p4_accept else 0)
+    p6 = _length_stats(lengths, 5)
+    p7 = _length_stats(pairs, 4)
+
+    # (name, keyspace, acceptance rate, mean length)
+    patterns = [
+        ("0: Random 8-15 chars", keyspace[0], 1, 11.5),
+        ("1: Number + specials", keyspace[1], 1, number_len + 3),
+        ("2: 3 letters/digits/specials", keyspace[2], 1, 9),
+        ("3: Shuffled mix", keyspace[3], 1, 4 + 3 + 2.5),
+        ("4: Word-based", p4_space, p4_accept, p4_len),
+        ("5: Mixed case + numbers", keyspace[5], 1, 5 + 3 + 2.5),
+        ("6: Word + special + year", p6[1] * special * 15, p6[0], p6[2]),
+        ("7: 2 words + 3 digits + special", p7[1] * digits ** 3 * special, p7[0], p7[2]),
+    ]
+
+    quotas = quotas or default_quotas()
+    estimates = []
+    for pattern, (name, keyspace, accept, mean) in enumerate(patterns):
+        quota = quotas.get(pattern, 0)
+        draws = expected_draws(keyspace, quota) / accept if accept else float('inf')
+        estimates.append(Estimate(name, draws if quota else 0, quota, mean, keyspace))
+
+    generated = sum(e.generated for e in estimates)
+    unique = sum(e.unique for e in estimates)
+    avg_length = sum(e.avg_length * e.unique for e in estimates) / unique if unique else 0
+    total = Estimate("Total", generated, unique, avg_length)
+    return format_report(f"Estimate for {lang} ({len(set(words))} words, {unique:,} passwords)",
+                         estimates, total)
+
+def parse_quotas(args):
+    """Build per-pattern quotas from --config, --total and --quota, in that order"""
+    total = None
+    overrides = {}
+    if args.config:
+        with open(args.config, encoding='utf-8') as f:
+            config = json.load(f)
+        total = config.get('total')
+        overrides.update({int(k): int(v) for k, v in config.get('quotas', {}).items()})
+    if args.total is not None:
+        total = args.total
+    for spec in args.quota or []:
+        pattern, _, count = spec.partition('=')
+        overrides[int(pattern)] = int(count)
+
+    quotas = default_quotas(total)
+    for pattern, count in overrides.items():
+        if pattern not in PATTERNS:
+            raise ValueError(f"unknown pattern {pattern}, expected 0-{len(PATTERNS) - 1}")
+        quotas[pattern] = count
+    return quotas
 
 def main():
     parser = argparse.ArgumentParser(description='Generate passwords with different language words')
-    parser.add_argument('lang', choices=['en', 'es', 'da', 'fi', 'no', 'fr', 'ru', 'cn', 'ng'],
+    parser.add_argument('lang', nargs='?', choices=['en', 'es', 'da', 'fi', 'no', 'fr', 'ru', 'cn', 'ng'],
                       help='Language for word-based passwords (en=English, es=Spanish, da=Danish, fi=Finnish, no=Norwegian, fr=French, ru=Russian, cn=Chinese, ng=Nigerian)')
+    parser.add_argument('-o', '--output', help='Output file (default: world-passwords_<lang>.txt)')
+    parser.add_argument('--stdout', action='store_true',
+                      help='Write passwords to stdout for piping; progress goes to stderr')
+    parser.add_argument('--backend', choices=['auto', 'python', 'numpy'], default='auto',
+                      help='Generator for the random patterns; auto uses numpy when installed')
+    parser.add_argument('-q', '--quiet', action='store_true', help='Disable progress output')
+    parser.add_argument('--estimate', '--dry-run', action='store_true',
+                      help='Print expected draws, dedupe ratio and output size, then exit')
+    parser.add_argument('--quota', action='append', metavar='PATTERN=N',
+                      help='Passwords to generate for one pattern (0-7); repeatable')
+    parser.add_argument('--total', type=int,
+                      help='Total passwords, split evenly across patterns (default: 400000)')
+    parser.add_argument('--config', help='JSON file with "total" and/or "quotas": {"pattern": n}')
+    parser.add_argument('--dedupe', choices=['auto', 'set', 'bloom'], default='auto',
+                      help='Duplicate filter: set is a 64-bit fingerprint table, 11-21 bytes per '
+                           'candidate, that only drops a candidate on a hash collision '
+                           '(~n^2/2^65 chance for n candidates); auto uses it while it fits '
+                           'in --dedupe-mb, a Bloom filter beyond')
+    parser.add_argument('--dedupe-mb', type=int, default=512,
+                      help='Memory cap for the duplicate filter in MB (default: 512)')
+    parser.add_argument('--exhaustive', action='store_true',
+                      help='Enumerate structured patterns (0, 1, 2, 3, 5) in keyspace order instead of sampling')
+    parser.add_argument('--prefetch', action='store_true',
+                      help='Fetch and cache word lists for all languages concurrently, then exit')
+    add_source_arguments(parser)
+    add_partition_arguments(parser, unit="password slots (each pattern's quota, "
+                                          "sharded pattern by pattern)")
+    add_policy_arguments(parser)
+    add_rank_arguments(parser)
+    add_stats_arguments(parser)
+    add_output_arguments(parser)
     
     args = parser.parse_args()
-    generate_passwords(args.lang)
+    source = source_from_args(args)
+    if args.prefetch:
+        for lang, words in prefetch_words(source).items():
+            print(f"{lang}: {len(words)} words")
+        return
+    if not args.lang:
+        parser.error("the following arguments are required: lang")
+    if args.backend == 'numpy' and np is None:
+        parser.error("--backend numpy requires numpy to be installed")
+    try:
+        quotas = parse_quotas(args)
+    except (OSError, ValueError) as e:
+        parser.error(f"invalid quotas: {e}")
+    output_file = '-' if args.stdout else args.output or f'world-passwords_{args.lang}.txt'
+    try:
+        partition = partition_from_args(args)
+        output_format = output_format_from_args(args, output_file)
+    except ValueError as e:
+        parser.error(str(e))
+    policy = None
+    if (args.min_length is not None or args.max_length is not None or args.require
+            or args.ban or args.max_repeat is not None):
+        try:
+            policy = policy_from_args(args, min_length=8, max_length=15)
+        except ValueError as e:
+            parser.error(f"invalid policy: {e}")
+    if args.estimate:
+        print(estimate_passwords(args.lang, quotas, source))
+        return
+    stats = stats_from_args(args)
+    try:
+        generate_passwords(args.lang, output_file, args.quiet, source, args.backend, quotas,
+                           args.dedupe, args.dedupe_mb * 1024 * 1024, args.exhaustive, partition,
+                           policy, ranker_from_args(args), stats, output_format)
+    except BrokenPipeError:
+        handle_broken_pipe()
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if stats is not None:
+            stats.save(args.stats, tool='worldpasses', lang=args.lang,
+                       exhaustive=args.exhaustive)
 
 if __name__ == "__main__":
     main()